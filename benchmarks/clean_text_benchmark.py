@@ -0,0 +1,64 @@
+"""
+Usage: python -m benchmarks.clean_text_benchmark --input_file data/tickets.json
+
+Compare the batch cleaning engine `clean_texts` with applying `clean_text` to every ticket.
+The input file is either a tickets JSON file (output of fetch_ticket.py) or a CSV file with
+`title` and `content` columns. The outputs of both paths are checked to be identical.
+"""
+
+import contextlib
+import io
+import json
+import os
+import time
+
+import click
+import pandas as pd
+
+from canosp2020.preprocessing import clean_text, clean_texts
+
+
+def load_texts(input_file):
+    _, extension = os.path.splitext(input_file)
+    if extension == ".csv":
+        df = pd.read_csv(input_file)
+        return list(df["title"].astype(str)) + list(df["content"].astype(str))
+
+    with open(input_file) as f:
+        tickets = json.load(f)
+    if isinstance(tickets, dict):
+        tickets = tickets["tickets"]
+    return [ticket["title"] for ticket in tickets] + [ticket["content"] for ticket in tickets]
+
+
+@click.command()
+@click.option("--input_file", default="data/tickets.json", help="Path to a tickets JSON or CSV file.")
+@click.option("--repeat", default=3, help="Number of timed runs, the fastest one is reported.")
+def main(input_file, repeat):
+    texts = load_texts(input_file)
+    num_chars = sum(len(text) for text in texts)
+    print(f"{len(texts)} texts, {num_chars} characters")
+
+    timings = {}
+    outputs = {}
+    for name, func in [
+        ("clean_text", lambda: [clean_text(text) for text in texts]),
+        ("clean_texts", lambda: clean_texts(texts)),
+    ]:
+        best = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            # `clean_text` prints the documents requests_html fails to parse
+            with contextlib.redirect_stdout(io.StringIO()):
+                outputs[name] = func()
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+        print(f"{name}: {best:.3f} sec, {len(texts) / best:.0f} texts/sec, {num_chars / best / 1e6:.2f} MB/sec")
+
+    mismatches = sum(1 for a, b in zip(outputs["clean_text"], outputs["clean_texts"]) if a != b)
+    print(f"Speedup: {timings['clean_text'] / timings['clean_texts']:.1f}x, {mismatches} mismatching texts")
+
+
+if __name__ == "__main__":
+    main()
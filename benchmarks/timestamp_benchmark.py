@@ -0,0 +1,72 @@
+"""
+Usage: python -m benchmarks.timestamp_benchmark --count 100000
+
+Compare converting SUMO `created` times one by one with `convert_pst_to_utc` and in a
+single vectorized pass with `convert_pst_to_utc_many`. The times are spread over several
+years so every DST transition, including ambiguous and nonexistent times, is covered.
+The outputs of both paths are checked to be identical.
+"""
+
+import random
+import time
+
+from datetime import datetime, timedelta
+
+import click
+import dateutil.parser as dp
+import pytz
+
+from fetch_ticket import SUMO_TIME_FORMAT, convert_pst_to_utc, convert_pst_to_utc_many
+
+
+def legacy_convert_pst_to_utc(dt_str):
+    # the implementation convert_pst_to_utc replaced, for timing only
+    pacific = pytz.timezone("US/Pacific")
+    loc_dt = pacific.localize(datetime.strptime(dt_str, SUMO_TIME_FORMAT))
+    dt_utc = loc_dt.astimezone(pytz.utc)
+    return dp.parse(dt_utc.strftime(SUMO_TIME_FORMAT)).strftime("%s")
+
+
+def make_times(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2018, 1, 1)
+    times = [start + timedelta(seconds=rng.randrange(4 * 365 * 24 * 3600)) for _ in range(count)]
+    # DST transitions of US/Pacific: nonexistent and ambiguous hours
+    times += [datetime(2020, 3, 8, 2, 30), datetime(2020, 11, 1, 1, 30), datetime(2019, 11, 3, 1, 0)]
+    return [t.strftime(SUMO_TIME_FORMAT) for t in times]
+
+
+def best_time(func, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+@click.command()
+@click.option("--count", default=100000, help="Number of timestamps.")
+@click.option("--repeat", default=3, help="Number of timed runs, the fastest one is reported.")
+def main(count, repeat):
+    times = make_times(count)
+
+    timings = {}
+    timings["legacy"], _ = best_time(lambda: [legacy_convert_pst_to_utc(t) for t in times], repeat)
+    timings["convert_pst_to_utc"], scalar = best_time(lambda: [convert_pst_to_utc(t) for t in times], repeat)
+    timings["convert_pst_to_utc_many"], vectorized = best_time(lambda: convert_pst_to_utc_many(times), repeat)
+
+    for name, elapsed in timings.items():
+        print(f"{name}: {elapsed:.3f} sec, {len(times) / elapsed:.0f} timestamps/sec")
+
+    mismatches = sum(1 for a, b in zip(scalar, vectorized) if a != b)
+    print(
+        f"Speedup: {timings['legacy'] / timings['convert_pst_to_utc_many']:.1f}x over legacy, "
+        f"{timings['convert_pst_to_utc'] / timings['convert_pst_to_utc_many']:.1f}x over scalar, "
+        f"{mismatches} mismatching timestamps"
+    )
+
+
+if __name__ == "__main__":
+    main()
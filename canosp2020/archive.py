@@ -0,0 +1,132 @@
+import glob
+import gzip
+import json
+import os
+import zlib
+
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+SEGMENT_PATTERN = "tickets-{:06d}.jsonl.gz"
+INDEX_FILE = "index.tsv"
+
+# A new segment is started once the current one is this large (compressed)
+SEGMENT_BYTES = 32 * 1024 * 1024
+
+# Number of tickets compressed together, the unit of random access
+BLOCK_SIZE = 256
+
+READ_SIZE = 64 * 1024
+
+
+class TicketArchive:
+    """
+    Append-only archive of raw tickets.
+
+    Tickets are stored as JSON lines in gzip compressed segments. Every block
+    of `block_size` tickets is a separate gzip member, so a segment reads as a
+    single gzip file and a ticket can be read by decompressing only its block.
+    `index.tsv` maps every ticket_id to its segment, the offset of its block
+    and its line in the block.
+
+    :param dir: Path to the archive directory
+    :param segment_bytes: Size of a segment before a new one is started
+    :param block_size: Number of tickets per block
+
+    >>> archive = TicketArchive("raw_data")
+    >>> archive.append(tickets)
+    >>> for ticket in archive.iter_tickets():
+    ...     pass
+    >>> archive.get(1282919)
+    """
+
+    def __init__(self, dir: str, segment_bytes: int = SEGMENT_BYTES, block_size: int = BLOCK_SIZE):
+        self._dir = dir
+        self._segment_bytes = segment_bytes
+        self._block_size = block_size
+        self._index = None
+
+    def segments(self):
+        return sorted(glob.glob(os.path.join(self._dir, SEGMENT_PATTERN.replace("{:06d}", "[0-9]" * 6))))
+
+    def _segment_for_append(self) -> str:
+        segments = self.segments()
+        if segments and os.path.getsize(segments[-1]) < self._segment_bytes:
+            return segments[-1]
+        return os.path.join(self._dir, SEGMENT_PATTERN.format(len(segments) + 1))
+
+    def append(self, tickets: Iterable[Dict]):
+        """
+        Append tickets at the end of the archive.
+
+        :param tickets: Tickets in the format of `fetch_ticket.transform_results`
+        """
+        os.makedirs(self._dir, exist_ok=True)
+        tickets = list(tickets)
+        index_lines = []
+        for start in range(0, len(tickets), self._block_size):
+            block = tickets[start : start + self._block_size]
+            segment = self._segment_for_append()
+            data = "".join(json.dumps(ticket) + "\n" for ticket in block).encode("utf-8")
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                f.write(gzip.compress(data))
+            name = os.path.basename(segment)
+            for line, ticket in enumerate(block):
+                index_lines.append(f"{ticket['ticket_id']}\t{name}\t{offset}\t{line}\n")
+                if self._index is not None:
+                    self._index[str(ticket["ticket_id"])] = (name, offset, line)
+
+        # the index is written after the data, an interrupted append never points to missing tickets
+        with open(os.path.join(self._dir, INDEX_FILE), "a") as f:
+            f.writelines(index_lines)
+
+    def iter_tickets(self) -> Iterator[Dict]:
+        """
+        Stream every ticket of the archive, in the order they were appended.
+        """
+        for segment in self.segments():
+            with gzip.open(segment, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def index(self) -> Dict[str, Tuple[str, int, int]]:
+        """
+        Location of every ticket, the last one appended wins for duplicate ids.
+
+        :rtype: A dict mapping ticket_id to (segment, block offset, line)
+        """
+        if self._index is None:
+            self._index = {}
+            path = os.path.join(self._dir, INDEX_FILE)
+            if os.path.exists(path):
+                with open(path) as f:
+                    for row in f:
+                        ticket_id, segment, offset, line = row.rstrip("\n").split("\t")
+                        self._index[ticket_id] = (segment, int(offset), int(line))
+        return self._index
+
+    def __contains__(self, ticket_id) -> bool:
+        return str(ticket_id) in self.index()
+
+    def get(self, ticket_id) -> Optional[Dict]:
+        """
+        Read a single ticket, only its block is decompressed.
+
+        :param ticket_id: Id of the ticket
+        :rtype: The ticket, or None if it is not in the archive
+        """
+        location = self.index().get(str(ticket_id))
+        if location is None:
+            return None
+        segment, offset, line = location
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = []
+        with open(os.path.join(self._dir, segment), "rb") as f:
+            f.seek(offset)
+            while not decompressor.eof:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                data.append(decompressor.decompress(chunk))
+        return json.loads(b"".join(data).split(b"\n")[line])
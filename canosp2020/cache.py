@@ -0,0 +1,148 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+from typing import Dict, Iterable, List, Tuple
+
+from .sqlite_limits import SQLITE_BATCH_SIZE
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_ticket(title: str, content: str, fingerprint: str) -> str:
+    """
+    Build a content address for a raw ticket.
+
+    :param title: Raw ticket title
+    :param content: Raw ticket content
+    :param fingerprint: Fingerprint of the preprocessing configuration
+    :rtype: A hex digest
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for part in (fingerprint, title, content):
+        encoded = part.encode("utf-8", errors="surrogatepass")
+        # prefix every part with its length so ("ab", "c") and ("a", "bc") never collide
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """
+    Hash the content of a file.
+
+    :param path: Path to the file
+    :rtype: A hex digest
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TicketCache:
+    """
+    Persistent cache of preprocessed tickets stored in a SQLite file.
+
+    Entries are keyed by `hash_ticket`, so a ticket is only preprocessed again
+    when its raw title/content or the pipeline configuration changes.
+    Once the cache holds more than `max_entries` tickets, the least recently
+    used entries are evicted.
+
+    :param path: Path to the cache file
+    :param max_entries: Maximum number of tickets kept in the cache
+
+    >>> cache = TicketCache("data/.preprocess_cache.sqlite")
+    >>> cache.get_many(keys)
+    >>> cache.stats()
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._path = path
+        self._max_entries = max_entries
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickets "
+            "(key TEXT PRIMARY KEY, title TEXT, content TEXT, lang TEXT, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tickets_last_used ON tickets (last_used)")
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, str, str]]:
+        """
+        Look up preprocessed tickets.
+
+        :param keys: Ticket keys built with `hash_ticket`
+        :rtype: A dict mapping every cached key to a (title, content, lang) tuple
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), SQLITE_BATCH_SIZE):
+            batch = unique_keys[start : start + SQLITE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, title, content, lang FROM tickets WHERE key IN ({placeholders})", batch
+            )
+            for key, title, content, lang in rows:
+                found[key] = (title, content, lang)
+
+        # refresh the LRU position of every entry we just used
+        now = time.time()
+        self._conn.executemany("UPDATE tickets SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+        self._conn.commit()
+
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, str, str, str]]):
+        """
+        Store preprocessed tickets and evict the least recently used ones
+        if the cache grew past its size limit.
+
+        :param entries: (key, title, content, lang) tuples
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO tickets (key, title, content, lang, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(key, title, content, lang, now) for key, title, content, lang in entries],
+        )
+        self._conn.commit()
+        self.evict()
+
+    def evict(self):
+        overflow = len(self) - self._max_entries
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM tickets WHERE key IN (SELECT key FROM tickets ORDER BY last_used LIMIT ?)", (overflow,)
+        )
+        self._conn.commit()
+        self.evictions += overflow
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self),
+        }
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,98 @@
+import pandas as pd
+import pyarrow as pa
+
+from pandas import DataFrame
+
+from .instrumentation import Stage
+from .jobs import PreprocessJob
+from .preprocessing import preprocess_df
+from .scheduler import CHUNKS_PER_WORKER, balanced_bounds, map_chunks, split_balanced, text_lengths
+from .worker_pool import InlinePool, WorkerPool
+
+
+def to_ipc(df: DataFrame) -> bytes:
+    """
+    Serialize a dataframe to an Arrow IPC stream.
+
+    The strings of a whole chunk are copied as a few contiguous buffers
+    instead of being pickled one by one.
+    """
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_ipc(data: bytes) -> DataFrame:
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def preprocess_chunk(df: DataFrame, num_2_word: bool = False) -> DataFrame:
+    """
+    Run the whole preprocessing pipeline on a chunk of tickets in the current process.
+
+    The stages of `canosp2020.preprocessing.preprocess_df`, the pipeline of
+    `Preprocess`, run one after the other with the spaCy model of the current
+    worker, see `canosp2020.worker_pool.worker_nlp`.
+
+    :param df: Raw tickets with `title` and `content` columns
+    :param num_2_word: Convert numbers to words
+    """
+    return preprocess_df(df, InlinePool(), num_2_word)
+
+
+def _preprocess_ipc_chunk(inputs):
+    data, num_2_word = inputs
+    return to_ipc(preprocess_chunk(from_ipc(data), num_2_word))
+
+
+def preprocess_parallel(df: DataFrame, pool: WorkerPool, num_2_word: bool = False, stage: Stage = None) -> DataFrame:
+    """
+    Preprocess tickets on the warm workers of `pool`.
+
+    Every worker runs the whole pipeline on its chunks, chunks are balanced
+    by number of characters, see `canosp2020.scheduler`, sent to the workers
+    and back as Arrow IPC streams and reassembled in order.
+
+        >>> with WorkerPool() as pool:
+        ...     df = preprocess_parallel(pd.read_csv("data/tickets.csv"), pool)
+
+    :param df: Raw tickets with `title` and `content` columns
+    :param pool: A `WorkerPool`, the custom stopwords are the ones of its spaCy model
+    :param num_2_word: Convert numbers to words
+    :param stage: A `canosp2020.instrumentation.Stage` recording the timing of every chunk
+    """
+    chunks = split_balanced(df, pool.n_cores * CHUNKS_PER_WORKER)
+    results = map_chunks(
+        _preprocess_ipc_chunk, chunks, pool, stage=stage, prepare=lambda chunk: (to_ipc(chunk), num_2_word)
+    )
+    return pd.concat([from_ipc(data) for data in results])
+
+
+def preprocess_resumable(
+    df: DataFrame, pool: WorkerPool, job: PreprocessJob, num_2_word: bool = False, stage: Stage = None
+) -> DataFrame:
+    """
+    Same as `preprocess_parallel`, but every chunk is checkpointed in the work
+    directory of `job` as soon as it is done, and the chunks done by a
+    previous run are not preprocessed again.
+
+    :param df: Raw tickets with `title` and `content` columns
+    :param pool: A `WorkerPool`
+    :param job: A `canosp2020.jobs.PreprocessJob`
+    :param num_2_word: Convert numbers to words
+    :param stage: A `canosp2020.instrumentation.Stage` recording the timing of every chunk
+    """
+    bounds = job.start(balanced_bounds(text_lengths(df), pool.n_cores * CHUNKS_PER_WORKER))
+    pending = job.pending()
+    chunks = [df.iloc[slice(*bounds[index])] for index in pending]
+    map_chunks(
+        _preprocess_ipc_chunk,
+        chunks,
+        pool,
+        stage=stage,
+        prepare=lambda chunk: (to_ipc(chunk), num_2_word),
+        callback=lambda position, data: job.save_chunk(pending[position], from_ipc(data)),
+    )
+    return job.assemble()
@@ -0,0 +1,72 @@
+from typing import Dict, List
+
+from .store import read_tickets
+
+
+class TicketWriter:
+    """
+    An output of `export_tickets`.
+
+    `open` is called with the taggers before the first ticket, `write` once
+    for every unique ticket, in input order, and `close` after the last one.
+    """
+
+    def open(self, taggers: List[Dict]):
+        pass
+
+    def write(self, ticket: Dict):
+        raise NotImplementedError
+
+    def close(self) -> str:
+        """
+        :rtype: A line summarizing what was written
+        """
+        return ""
+
+
+class ExportStats:
+    """Statistics about the tickets read by `export_tickets`"""
+
+    def __init__(self):
+        self.total_tickets = 0
+        self.unique_tickets = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.total_tickets - self.unique_tickets
+
+    def __str__(self):
+        return f"{self.unique_tickets} tickets ({self.duplicates} duplicates)"
+
+
+def export_tickets(path, writers: List[TicketWriter]) -> ExportStats:
+    """
+    Read the tickets once and feed every unique ticket to all the writers.
+
+    :param path: Path to a tickets JSON file or a `.db` ticket store, see `canosp2020.store.read_tickets`
+    :param writers: The outputs
+    :rtype: Statistics about the tickets read
+    """
+    taggers, tickets = read_tickets(path)
+    for writer in writers:
+        writer.open(taggers)
+
+    stats = ExportStats()
+    ticket_ids = set()
+    for ticket in tickets:
+        stats.total_tickets += 1
+        ticket_id = str(ticket["ticket_id"])
+        if ticket_id in ticket_ids:
+            continue
+        ticket_ids.add(ticket_id)
+        stats.unique_tickets += 1
+
+        for writer in writers:
+            writer.write(ticket)
+
+    print(f"Read {stats} from {path}")
+    for writer in writers:
+        summary = writer.close()
+        if summary:
+            print(summary)
+    return stats
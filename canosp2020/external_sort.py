@@ -0,0 +1,78 @@
+import gzip
+import heapq
+import itertools
+import json
+import os
+import tempfile
+
+from typing import Callable, Dict, Iterable, Iterator
+
+# Number of items sorted in memory at once
+RUN_SIZE = 50000
+
+
+def _write_run(items, directory, index) -> str:
+    path = os.path.join(directory, f"run-{index:06d}.jsonl.gz")
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as f:
+        for item in items:
+            f.write(json.dumps(item) + "\n")
+    return path
+
+
+def _read_run(path) -> Iterator[Dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def external_sort(items: Iterable[Dict], key: Callable, run_size: int = RUN_SIZE) -> Iterator[Dict]:
+    """
+    Sort a stream of JSON serializable items with bounded memory.
+
+    The stream is cut into runs of `run_size` items, every run is sorted in
+    memory and spilled to a temporary file, then the runs are merged.
+    The sort is stable: items with equal keys come out in input order.
+
+    :param items: An iterable of dicts
+    :param key: Sort key
+    :param run_size: Number of items held in memory while sorting a run
+    :rtype: A generator of items in sorted order
+    """
+    items = iter(items)
+    with tempfile.TemporaryDirectory(prefix="external_sort-") as directory:
+        runs = []
+        for index in itertools.count():
+            run = list(itertools.islice(items, run_size))
+            if not run:
+                break
+            run.sort(key=key)
+            runs.append(_write_run(run, directory, index))
+            del run
+
+        # heapq.merge takes equal items from the earlier runs first, which keeps the sort stable
+        yield from heapq.merge(*[_read_run(path) for path in runs], key=key)
+
+
+def unique_by(items: Iterable[Dict], key: Callable, keep: str = "first") -> Iterator[Dict]:
+    """
+    Drop the items of a sorted stream whose key is the same as a neighbour's.
+
+    :param items: Items sorted by `key`
+    :param key: Key of an item
+    :param keep: Which of the items with the same key is kept, "first" or "last"
+    """
+    if keep not in ("first", "last"):
+        raise ValueError(f'keep must be "first" or "last", not {keep!r}')
+
+    previous_key = previous = missing = object()
+    for item in items:
+        current = key(item)
+        if current != previous_key:
+            if keep == "last" and previous is not missing:
+                yield previous
+            if keep == "first":
+                yield item
+            previous_key = current
+        previous = item
+    if keep == "last" and previous is not missing:
+        yield previous
@@ -0,0 +1,193 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger("fetch_ticket")
+
+# Responses worth trying again, anything else is reported as failed right away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter.
+
+    :param rate: Number of tokens added every second
+    :param capacity: Maximum number of tokens, allows short bursts
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, waiting until one is available.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+class FetchError(Exception):
+    """A page could not be fetched, even after retrying"""
+
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """
+    Number of seconds the server asked us to wait, from the Retry-After header.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PageFetcher:
+    """
+    Fetch the pages of a paginated JSON API concurrently.
+
+    Pages are fetched by a bounded pool of threads sharing a pooled
+    `requests.Session`. Requests are rate limited by a token bucket, and
+    retried with exponential backoff on 429/5xx responses and connection
+    errors, honouring the Retry-After header.
+    Pages still failing after `max_retries` retries are recorded in `failed`.
+
+    :param url: URL of the API
+    :param params: Query parameters shared by every page
+    :param concurrency: Maximum number of requests in flight
+    :param rate: Maximum number of requests per second
+    :param max_retries: Number of times a page is retried
+    :param backoff: Delay before the first retry in seconds, doubled on every retry
+    :param max_backoff: Maximum delay between two retries in seconds
+    :param timeout: Timeout of a request in seconds
+
+    >>> fetcher = PageFetcher("https://support.mozilla.org/api/2/question", {"format": "json"})
+    >>> first = fetcher.fetch_page(1)
+    >>> for page, data in fetcher.fetch_pages(range(2, 10)):
+    ...     archive_page(transform_results(data), page)
+    >>> print(fetcher.report())
+    """
+
+    def __init__(
+        self,
+        url: str,
+        params: Dict[str, str] = None,
+        concurrency: int = 8,
+        rate: float = 5.0,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        timeout: float = 30.0,
+    ):
+        self._url = url
+        self._params = dict(params or {})
+        self._concurrency = concurrency
+        self._bucket = TokenBucket(rate, capacity=max(1.0, min(rate, concurrency)))
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._timeout = timeout
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self.failed = {}
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+    def _delay(self, attempt: int, response: requests.Response = None) -> float:
+        if response is not None:
+            delay = retry_after(response)
+            if delay is not None:
+                return min(delay, self._max_backoff)
+        delay = min(self._max_backoff, self._backoff * 2**attempt)
+        return random.uniform(delay / 2, delay)
+
+    def fetch_page(self, page: int) -> Dict:
+        """
+        Fetch a single page, retrying if needed.
+
+        :param page: Page number
+        :rtype: The decoded JSON response
+        """
+        params = {**self._params, "page": str(page)}
+        for attempt in range(self._max_retries + 1):
+            self._bucket.acquire()
+            response = None
+            try:
+                response = self._session.get(self._url, params=params, timeout=self._timeout)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        error = "invalid JSON"
+                else:
+                    error = f"HTTP {response.status_code}"
+                    if response.status_code not in RETRY_STATUSES:
+                        break
+
+            if attempt < self._max_retries:
+                delay = self._delay(attempt, response)
+                logger.info(f"page {page}: {error}, retrying in {delay:.1f} sec")
+                with self._retries_lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+        raise FetchError(f"page {page}: {error}")
+
+    def fetch_pages(self, pages: Iterable[int]) -> Iterator[Tuple[int, Dict]]:
+        """
+        Fetch pages concurrently, failed pages are recorded in `failed`.
+
+        :param pages: Page numbers
+        :rtype: A generator of (page, data) tuples, in completion order
+        """
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            futures = {executor.submit(self.fetch_page, page): page for page in pages}
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    yield page, future.result()
+                except FetchError as e:
+                    self.failed[page] = str(e)
+
+    def report(self) -> str:
+        if not self.failed:
+            return f"All pages fetched ({self.retries} retries)"
+        lines = [f"{len(self.failed)} pages failed ({self.retries} retries):"]
+        lines += [f"  {error}" for _, error in sorted(self.failed.items())]
+        return "\n".join(lines)
+
+    def close(self):
+        self._session.close()
@@ -0,0 +1,57 @@
+import json
+import os
+
+from collections import Counter
+from typing import List, Optional
+
+from .worker_pool import worker_nlp
+
+# The frequency table of `<input>` is stored in `<input><FREQUENCIES_SUFFIX>`
+FREQUENCIES_SUFFIX = ".freq.json"
+
+
+def count_tokens(texts: List[str]) -> Counter:
+    """
+    Count the tokens of a batch of texts, run by the workers of a `WorkerPool`.
+
+    :param texts: A list of texts
+    :rtype: A Counter of token texts, in the order they were first seen
+    """
+    nlp = worker_nlp()
+    counter = Counter()
+    for doc in nlp.pipe(texts, disable=["tagger", "parser", "ner", "language_detector"]):
+        counter.update(token.text for token in doc)
+    return counter
+
+
+def load_frequencies(input_file: str, fingerprint: str) -> Optional[Counter]:
+    """
+    Load the frequency table stored next to `input_file`.
+
+    :param input_file: Path to the file the table was built from
+    :param fingerprint: Fingerprint of the file content and of the tokenizer
+    :rtype: The frequency table, or None if it is missing or out of date
+    """
+    try:
+        with open(input_file + FREQUENCIES_SUFFIX, "r", encoding="utf-8") as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if table.get("fingerprint") != fingerprint:
+        return None
+    # stored as a list of pairs to keep the order ties are broken in
+    return Counter(dict(table["counts"]))
+
+
+def save_frequencies(input_file: str, fingerprint: str, counter: Counter):
+    """
+    Store the frequency table of `input_file` next to it.
+
+    :param input_file: Path to the file the table was built from
+    :param fingerprint: Fingerprint of the file content and of the tokenizer
+    :param counter: The frequency table
+    """
+    path = input_file + FREQUENCIES_SUFFIX
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "counts": list(counter.items())}, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,302 @@
+"""
+Lightweight HTML to text conversion.
+
+`html_to_text` reproduces `requests_html.HTML(html=text).text` (BeautifulSoup's
+html.parser, converted to lxml and rendered by pyquery) with a single streaming
+pass of Python's `html.parser`, without building any document tree.
+The behaviours of that stack which change the extracted text are emulated:
+
+    - block level tags are separated by whitespace, inline tags are not
+    - text before the first and after the last top level tag is dropped
+    - entities are unescaped twice (once by BeautifulSoup and once by lxml)
+    - doctype and other declarations inside the document are kept as text
+
+Documents the emulation cannot reproduce exactly (characters lxml refuses,
+unusual tag names, documents without any tag or text, declared encodings)
+return None, so the caller can fall back to requests_html.
+"""
+
+import re
+
+from html.entities import html5, name2codepoint
+from html.parser import HTMLParser
+
+# https://github.com/gawel/pyquery/blob/master/pyquery/text.py
+INLINE_TAGS = {
+    "a",
+    "abbr",
+    "acronym",
+    "b",
+    "bdo",
+    "big",
+    "br",
+    "button",
+    "cite",
+    "code",
+    "dfn",
+    "em",
+    "i",
+    "img",
+    "input",
+    "kbd",
+    "label",
+    "map",
+    "object",
+    "q",
+    "samp",
+    "script",
+    "select",
+    "small",
+    "span",
+    "strong",
+    "sub",
+    "sup",
+    "textarea",
+    "time",
+    "tt",
+    "var",
+}
+
+# Tags BeautifulSoup closes as soon as they are opened
+VOID_TAGS = {
+    "area",
+    "base",
+    "basefont",
+    "bgsound",
+    "br",
+    "col",
+    "command",
+    "embed",
+    "frame",
+    "hr",
+    "image",
+    "img",
+    "input",
+    "isindex",
+    "keygen",
+    "link",
+    "menuitem",
+    "meta",
+    "nextid",
+    "param",
+    "source",
+    "spacer",
+    "track",
+    "wbr",
+}
+
+BLOCK_SEPARATOR = "\n"
+
+# Names lxml accepts for elements and attributes without complaining
+SAFE_NAME_RE = re.compile(r"^[A-Za-z_][\w.-]*$")
+
+# Characters lxml refuses to store in a tree
+XML_INCOMPATIBLE_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+# Markup that can make w3lib decode the document with another encoding
+ENCODING_DECLARATION_RE = re.compile(r"<\s*(?:meta\b[^>]*charset|\?xml\b[^>]*encoding)", re.IGNORECASE)
+
+# lxml.html.soupparser unescapes the text BeautifulSoup already unescaped once more
+LXML_ENTITY_RE = re.compile(r"&(\w+);")
+
+# Whitespace squashed by pyquery that Python does not consider whitespace
+ZERO_WIDTH_SPACE = "\u200b"
+
+NUMERIC_REFERENCE_RE = {
+    10: re.compile(r"^(\d+)(.*)$"),
+    16: re.compile(r"^([0-9a-fA-F]+)(.*)$"),
+}
+
+
+class UnsupportedDocument(Exception):
+    """The document uses HTML the emulation cannot reproduce exactly"""
+
+
+def _lxml_unescape_entity(match):
+    try:
+        return chr(name2codepoint[match.group(1)])
+    except KeyError:
+        return match.group(0)
+
+
+def _numeric_reference(number):
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= number <= 0x9F:
+        # Numeric references using the Windows-1252 code point instead of the Unicode one
+        try:
+            return bytes([number]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(number)
+
+
+class HTMLTextExtractor(HTMLParser):
+    """
+    Streaming tag stripper, reusable across documents.
+
+    >>> extractor = HTMLTextExtractor()
+    >>> extractor.extract("<p>Firefox <b>72</b></p><p>crashes</p>")
+    'Firefox 72\\ncrashes'
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+
+    def reset(self):
+        super().reset()
+        self._stack = []
+        self._data = []
+        self._parts = []
+        # indexes in `_parts` of text found outside of any tag
+        self._top_level_text = []
+        # indexes in `_parts` of the markers of tags opened outside of any tag
+        self._top_level_tags = []
+        self._has_markup = False
+
+    def extract(self, text):
+        """
+        Extract the text of a HTML document.
+
+        :param text: HTML document
+        :rtype: The text, or None if the document is not supported
+        """
+        self.reset()
+        try:
+            self.feed(text)
+            self.close()
+            self._flush()
+        except UnsupportedDocument:
+            return None
+
+        if not self._top_level_tags:
+            if self._has_markup:
+                # Comments or declarations without any tag, lxml may refuse to parse it
+                return None
+            parts = self._parts
+        else:
+            first, last = self._top_level_tags[0], self._top_level_tags[-1]
+            dropped = {index for index in self._top_level_text if index < first or index > last}
+            parts = [part for index, part in enumerate(self._parts) if index not in dropped]
+
+        return "".join(parts).replace(ZERO_WIDTH_SPACE, " ")
+
+    def _flush(self):
+        if not self._data:
+            return
+        self._add_text("".join(self._data))
+        self._data = []
+
+    def _add_text(self, text):
+        text = LXML_ENTITY_RE.sub(_lxml_unescape_entity, text)
+        if XML_INCOMPATIBLE_RE.search(text):
+            raise UnsupportedDocument
+        if not self._stack:
+            self._top_level_text.append(len(self._parts))
+        self._parts.append(text)
+
+    def _open(self, tag, attrs):
+        if not SAFE_NAME_RE.match(tag) or tag == "html":
+            # lxml rearranges the document around <html> tags
+            raise UnsupportedDocument
+        for name, value in attrs:
+            if not SAFE_NAME_RE.match(name) or (value and XML_INCOMPATIBLE_RE.search(value)):
+                raise UnsupportedDocument
+
+        self._flush()
+        self._has_markup = True
+        if not self._stack:
+            self._top_level_tags.append(len(self._parts))
+            self._parts.append("")
+        if tag == "br" or tag not in INLINE_TAGS:
+            self._parts.append(BLOCK_SEPARATOR)
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, attrs)
+        if tag in VOID_TAGS:
+            if tag != "br" and tag not in INLINE_TAGS:
+                self._parts.append(BLOCK_SEPARATOR)
+        else:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs)
+        if tag != "br" and tag not in INLINE_TAGS:
+            self._parts.append(BLOCK_SEPARATOR)
+
+    def handle_endtag(self, tag):
+        self._flush()
+        self._has_markup = True
+        if tag not in self._stack:
+            # BeautifulSoup ignores end tags of elements which are not open
+            return
+        while True:
+            opened = self._stack.pop()
+            if opened not in INLINE_TAGS:
+                self._parts.append(BLOCK_SEPARATOR)
+            if opened == tag:
+                break
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_entityref(self, name):
+        character = html5.get(name + ";")
+        self._data.append(character if character is not None else f"&{name}")
+
+    def handle_charref(self, name):
+        base = 10
+        if name[:1] in ("x", "X"):
+            name = name[1:]
+            base = 16
+        try:
+            self._data.append(_numeric_reference(int(name, base)))
+        except ValueError:
+            match = NUMERIC_REFERENCE_RE[base].match(name)
+            if match is None:
+                self._data.append(name)
+            else:
+                self._data.append(_numeric_reference(int(match.group(1), base)))
+                self._data.append(match.group(2))
+
+    def handle_comment(self, data):
+        self._flush()
+        self._has_markup = True
+
+    def handle_pi(self, data):
+        self._flush()
+        self._has_markup = True
+
+    def handle_decl(self, decl):
+        self._flush()
+        self._has_markup = True
+        self._add_text(decl[len("DOCTYPE ") :])
+
+    def unknown_decl(self, data):
+        self._flush()
+        self._has_markup = True
+        if data.upper().startswith("CDATA["):
+            data = data[len("CDATA[") :]
+        self._add_text(data)
+
+
+def html_to_text(text, extractor=None):
+    """
+    Convert a HTML document to text the same way `requests_html.HTML(html=text).text` does.
+
+    :param text: HTML document
+    :param extractor: A `HTMLTextExtractor` to reuse between calls
+    :rtype: The text, or None if the document is not supported
+    """
+    if "<" not in text and "&" not in text:
+        # Plain text, nothing to parse
+        if XML_INCOMPATIBLE_RE.search(text):
+            return None
+        return text.replace(ZERO_WIDTH_SPACE, " ")
+
+    if text.startswith("\ufeff") or ENCODING_DECLARATION_RE.search(text) or XML_INCOMPATIBLE_RE.search(text):
+        return None
+
+    if extractor is None:
+        extractor = HTMLTextExtractor()
+    return extractor.extract(text)
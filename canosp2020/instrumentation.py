@@ -0,0 +1,182 @@
+import contextlib
+import json
+import os
+import resource
+import sys
+import time
+
+from typing import Callable, Dict, Iterable, List
+
+# ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """
+    Peak resident set size of the current process, or of its terminated children.
+    """
+    return resource.getrusage(who).ru_maxrss * RSS_UNIT / (1024 * 1024)
+
+
+def _cpu_time(who) -> float:
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+class TimedFunction:
+    """
+    Run a function in a worker process and return its result with the timing of the call.
+
+    The wrapper is picklable as long as `func` is, so it can be sent to a pool.
+
+    :param func: The function run by the workers
+    """
+
+    def __init__(self, func: Callable):
+        self.func = func
+
+    def __call__(self, inputs):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        result = self.func(inputs)
+        timing = {
+            "pid": os.getpid(),
+            "wall_time": time.perf_counter() - start_wall,
+            "cpu_time": time.process_time() - start_cpu,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        return result, timing
+
+
+class Stage:
+    """
+    Measurements of a single stage, see `Instrumentation.stage`.
+
+    :param name: Name of the stage
+    :param docs: Number of documents processed by the stage
+    :param chars: Number of characters processed by the stage
+    """
+
+    def __init__(self, name: str, docs: int = 0, chars: int = 0):
+        self.name = name
+        self.docs = docs
+        self.chars = chars
+        self.chunks = []
+        # stage specific measurements, e.g. cache hits, reported as they are
+        self.extra = {}
+
+    def timed(self, func: Callable) -> TimedFunction:
+        return TimedFunction(func)
+
+    def collect(self, results: Iterable) -> Iterable:
+        """
+        Record the chunk timings of the results of a `TimedFunction` and yield the results.
+
+        :param results: An iterable of (result, timing) tuples
+        """
+        for result, timing in results:
+            self.chunks.append(timing)
+            yield result
+
+    def metrics(self, wall_time: float, cpu_time: float, peak_rss: float) -> Dict:
+        workers = {}
+        for chunk in self.chunks:
+            worker = workers.setdefault(chunk["pid"], {"chunks": 0, "wall_time": 0.0, "cpu_time": 0.0})
+            worker["chunks"] += 1
+            worker["wall_time"] += chunk["wall_time"]
+            worker["cpu_time"] += chunk["cpu_time"]
+            peak_rss = max(peak_rss, chunk["peak_rss_mb"])
+
+        chunk_times = [chunk["wall_time"] for chunk in self.chunks]
+        mean_chunk_time = sum(chunk_times) / len(chunk_times) if chunk_times else 0.0
+        return {
+            "stage": self.name,
+            "wall_time": wall_time,
+            "cpu_time": cpu_time + sum(worker["cpu_time"] for worker in workers.values()),
+            "docs": self.docs,
+            "chars": self.chars,
+            "docs_per_sec": self.docs / wall_time if wall_time else 0.0,
+            "chars_per_sec": self.chars / wall_time if wall_time else 0.0,
+            "peak_rss_mb": peak_rss,
+            "workers": {str(pid): worker for pid, worker in workers.items()},
+            # slowest chunk compared to the average one, 1.0 means perfectly balanced
+            "chunk_skew": max(chunk_times) / mean_chunk_time if mean_chunk_time else None,
+            "extra": dict(self.extra),
+        }
+
+
+def print_stage(metrics: Dict):
+    """
+    Default callback, print a one line summary of a stage.
+    """
+    line = f"{metrics['stage']}: {metrics['wall_time']} sec ({metrics['docs_per_sec']:.1f} docs/sec"
+    if metrics["chunk_skew"] is not None:
+        line += f", chunk skew {metrics['chunk_skew']:.2f}"
+    line += ")"
+    for key, value in metrics["extra"].items():
+        line += f", {key} {value}"
+    print(line)
+
+
+class JSONLinesWriter:
+    """
+    Callback appending the metrics of every stage to a JSON lines file.
+
+    :param path: Path to the output file
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+    def __call__(self, metrics: Dict):
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(metrics) + "\n")
+
+
+class Instrumentation:
+    """
+    Collect wall time, CPU time, throughput, peak memory and per-worker
+    timings of the stages of a pipeline.
+
+    The metrics of every stage are passed to the callbacks as a dict when the
+    stage ends, and kept in `stages`.
+
+    :param callbacks: Functions called with the metrics of every stage,
+        `print_stage` by default
+
+    >>> instrumentation = Instrumentation([print_stage, JSONLinesWriter("metrics.jsonl")])
+    >>> with instrumentation.stage("Clean text", texts) as stage:
+    ...     results = list(stage.collect(pool.imap(stage.timed(func), chunks)))
+    >>> instrumentation.to_json()
+    """
+
+    def __init__(self, callbacks: List[Callable[[Dict], None]] = None):
+        self._callbacks = list(callbacks) if callbacks is not None else [print_stage]
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str, texts: Iterable[str] = None):
+        """
+        Measure the code run inside the `with` block.
+
+        CPU time includes the main process, the children it waited for and the
+        chunks timed with `Stage.timed`.
+
+        :param name: Name of the stage
+        :param texts: Texts processed by the stage, to compute the throughput
+        """
+        texts = list(texts) if texts is not None else []
+        stage = Stage(name, len(texts), sum(len(text) for text in texts if isinstance(text, str)))
+        start_wall = time.perf_counter()
+        start_cpu = _cpu_time(resource.RUSAGE_SELF) + _cpu_time(resource.RUSAGE_CHILDREN)
+        yield stage
+        wall_time = time.perf_counter() - start_wall
+        cpu_time = _cpu_time(resource.RUSAGE_SELF) + _cpu_time(resource.RUSAGE_CHILDREN) - start_cpu
+        peak_rss = max(peak_rss_mb(), peak_rss_mb(resource.RUSAGE_CHILDREN))
+
+        metrics = stage.metrics(wall_time, cpu_time, peak_rss)
+        self.stages.append(metrics)
+        for callback in self._callbacks:
+            callback(metrics)
+
+    def to_json(self) -> str:
+        return json.dumps(self.stages, indent=2)
@@ -0,0 +1,118 @@
+import glob
+import json
+import os
+
+import pandas as pd
+
+from pandas import DataFrame
+from typing import Dict, List, Tuple
+
+from .cache import file_hash
+
+MANIFEST = "manifest.json"
+
+
+class IncompleteJob(Exception):
+    """Some chunks of the job have not been preprocessed yet"""
+
+
+class PreprocessJob:
+    """
+    Checkpoints of a preprocessing run, stored in a work directory.
+
+    The work directory holds a `manifest.json` describing the job (hash of
+    the input file, row range of every chunk and pipeline configuration) and
+    one parquet file per completed chunk. Chunks are written atomically, so a
+    run killed at any point can be resumed: only the chunks missing from the
+    work directory are preprocessed again.
+    If the input file or the configuration changed, the previous checkpoints
+    are discarded.
+
+    :param work_dir: Path to the work directory
+    :param input_file: Path to the input file
+    :param config: Everything besides the input that changes the output, must be JSON serializable
+
+    >>> job = PreprocessJob("data/.preprocess_job", "data/tickets.csv", {"num_2_word": False})
+    >>> bounds = job.start([(0, 10000), (10000, 20000)])
+    >>> for index in job.pending():
+    ...     job.save_chunk(index, preprocess(df.iloc[slice(*bounds[index])]))
+    >>> df = job.assemble()
+    """
+
+    def __init__(self, work_dir: str, input_file: str, config: Dict):
+        self._work_dir = work_dir
+        self._input_file = input_file
+        self._config = config
+        self._bounds = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self._work_dir, MANIFEST)
+
+    def chunk_path(self, index: int) -> str:
+        return os.path.join(self._work_dir, f"chunk-{index:06d}.parquet")
+
+    def start(self, bounds: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """
+        Resume the job if the work directory holds a job for the same input and
+        configuration, otherwise start a new job with the given chunks.
+
+        :param bounds: (start, end) row range of every chunk of a new job
+        :rtype: The row ranges of the job, the ones of the manifest when resuming
+        """
+        os.makedirs(self._work_dir, exist_ok=True)
+        input_hash = file_hash(self._input_file)
+
+        manifest = None
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        if manifest and manifest["input_hash"] == input_hash and manifest["config"] == self._config:
+            self._bounds = [tuple(bound) for bound in manifest["bounds"]]
+            done = len(self._bounds) - len(self.pending())
+            print(f"Resuming job in {self._work_dir}: {done}/{len(self._bounds)} chunks done")
+            return self._bounds
+
+        for path in glob.glob(os.path.join(self._work_dir, "chunk-*.parquet")):
+            os.remove(path)
+        self._bounds = [tuple(bound) for bound in bounds]
+        manifest = {
+            "input_file": str(self._input_file),
+            "input_hash": input_hash,
+            "config": self._config,
+            "bounds": self._bounds,
+        }
+        self._write_atomic(self.manifest_path, lambda path: _write_json(path, manifest))
+        return self._bounds
+
+    def is_done(self, index: int) -> bool:
+        return os.path.exists(self.chunk_path(index))
+
+    def pending(self) -> List[int]:
+        return [index for index in range(len(self._bounds)) if not self.is_done(index)]
+
+    def save_chunk(self, index: int, df: DataFrame):
+        self._write_atomic(self.chunk_path(index), df.to_parquet)
+
+    def load_chunk(self, index: int) -> DataFrame:
+        return pd.read_parquet(self.chunk_path(index))
+
+    def assemble(self) -> DataFrame:
+        """
+        Concatenate the chunks once every one of them is done.
+        """
+        pending = self.pending()
+        if pending:
+            raise IncompleteJob(f"{len(pending)} chunks of {self._work_dir} are not done: {pending[:10]}")
+        return pd.concat([self.load_chunk(index) for index in range(len(self._bounds))])
+
+    @staticmethod
+    def _write_atomic(path, write):
+        tmp_path = path + ".tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,168 @@
+import itertools
+import json
+
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# Number of characters read from the file at once
+READ_SIZE = 64 * 1024
+
+WHITESPACE = " \t\n\r"
+
+
+class _Buffer:
+    """
+    Characters of a file, read in chunks as the parser moves forward.
+    """
+
+    def __init__(self, f, read_size):
+        self._f = f
+        self._read_size = read_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Read the next chunk, dropping the characters already parsed.
+
+        :rtype: False at the end of the file
+        """
+        if self.eof:
+            return False
+        chunk = self._f.read(self._read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Next character that is not whitespace, without consuming it.
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                raise json.JSONDecodeError("Unexpected end of file", self.text, self.pos)
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self.text, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self, decoder: json.JSONDecoder) -> Any:
+        """
+        Decode the next JSON value, reading more of the file until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number or literal at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_items(buffer: _Buffer, decoder: json.JSONDecoder) -> Iterator[Any]:
+    """
+    Decode the items of the array starting at the buffer position, one at a time.
+    """
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        buffer.expect("]")
+        return
+    while True:
+        yield buffer.value(decoder)
+        if buffer.expect(",]") == "]":
+            return
+
+
+def iter_items(path, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Stream the items of the JSON array in a file, with bounded memory.
+
+    :param path: Path to a file holding a JSON array
+    :param read_size: Number of characters read from the file at once
+    :rtype: A generator of the items, in file order
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        yield from _iter_items(_Buffer(f, read_size), decoder)
+
+
+def iter_members(path, stream_key: str = "tickets", read_size: int = READ_SIZE) -> Iterator[Tuple[str, Any]]:
+    """
+    Stream the members of the JSON object in a file, with bounded memory.
+
+    The items of the `stream_key` array are decoded one at a time and
+    yielded as separate (stream_key, item) pairs, every other member is
+    decoded as a whole.
+
+    :param path: Path to a file holding a JSON object
+    :param stream_key: Member holding a large array
+    :param read_size: Number of characters read from the file at once
+    :rtype: A generator of (key, value) tuples, in file order
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = _Buffer(f, read_size)
+        buffer.expect("{")
+        if buffer.peek() == "}":
+            return
+        while True:
+            key = buffer.value(decoder)
+            buffer.expect(":")
+            if key == stream_key and buffer.peek() == "[":
+                for item in _iter_items(buffer, decoder):
+                    yield key, item
+            else:
+                yield key, buffer.value(decoder)
+            if buffer.expect(",}") == "}":
+                return
+
+
+def read_json_tickets(path, read_size: int = READ_SIZE) -> Tuple[List[Dict], Iterable[Dict]]:
+    """
+    Read the taggers of a tickets JSON file, then stream its tickets.
+
+    Only one ticket is held in memory at a time. `fetch_ticket.py merge` writes
+    the taggers before the tickets; for files with the taggers after the
+    tickets, the file is read twice.
+
+    :param path: Path to a JSON file in the format of `data/tickets.json`
+    :param read_size: Number of characters read from the file at once
+    :rtype: A (taggers, tickets) tuple, tickets is a generator
+    """
+    members = iter_members(path, "tickets", read_size)
+    header = {}
+    first = []
+    for key, value in members:
+        if key == "tickets":
+            first = [value]
+            break
+        header[key] = value
+
+    taggers = header.get("taggers")
+    if taggers is None:
+        # the taggers come after the tickets, skim through the tickets to find them
+        members.close()
+        taggers = next((value for key, value in iter_members(path, "tickets", read_size) if key == "taggers"), None)
+        if taggers is None:
+            raise KeyError(f"No taggers in {path}")
+        members = iter_members(path, "tickets", read_size)
+        first = []
+
+    tickets = itertools.chain(first, (value for key, value in members if key == "tickets"))
+    return taggers, tickets
@@ -1,7 +1,84 @@
-from spacy.tokens import Doc
-from langdetect import detect_langs
+import hashlib
+import itertools
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from langdetect import DetectorFactory, detect_langs
 from langdetect.lang_detect_exception import LangDetectException
 
+# langdetect is randomized, seed it so the same text always gets the same language
+DetectorFactory.seed = 0
+
+# Maximum number of texts whose language is remembered, see `detect_languages`
+MEMO_SIZE = 100000
+
+# ASCII text with enough of these words is English, no need to run langdetect
+ENGLISH_WORDS = frozenset(
+    "a about after all an and are as at be but by can do does for from have how i if in is it my no not of on "
+    "or so that the this to was what when why will with you your".split()
+)
+FAST_PATH_MIN_WORDS = 5
+FAST_PATH_MIN_RATIO = 0.3
+FAST_PATH_SCORE = 0.99
+
+UNKNOWN = {"language": "UNKNOWN", "score": 0.0}
+
+_memo = OrderedDict()
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+
+
+def is_obviously_english(text: str) -> bool:
+    if not text.isascii():
+        return False
+    words = text.lower().split()
+    if len(words) < FAST_PATH_MIN_WORDS:
+        return False
+    english = sum(1 for word in words if word.strip(".,;:!?\"'()") in ENGLISH_WORDS)
+    return english >= FAST_PATH_MIN_RATIO * len(words)
+
+
+def _detect(text: str) -> Dict:
+    if is_obviously_english(text):
+        return {"language": "en", "score": FAST_PATH_SCORE}
+    try:
+        detected_language = detect_langs(text)[0]
+        return {"language": str(detected_language.lang), "score": float(detected_language.prob)}
+    except LangDetectException:
+        return dict(UNKNOWN)
+
+
+def detect_languages(texts: Iterable[str]) -> List[Dict]:
+    """
+    Detect the language of many texts at once, usable outside of spaCy.
+
+    Results are memoized by text hash, repeated texts (in the batch or in
+    earlier calls) are only detected once.
+
+        >>> detect_languages(["Firefox keeps crashing when I open a new tab", "Firefox plante au démarrage"])
+        [{'language': 'en', 'score': 0.99}, {'language': 'fr', 'score': 0.99...}]
+
+    :param texts: Texts or spaCy Docs
+    :rtype: A list of {"language": ..., "score": ...} dicts
+    """
+    results = []
+    for text in texts:
+        text = getattr(text, "text", text)
+        key = _text_key(text)
+        result = _memo.get(key)
+        if result is None:
+            result = _detect(text)
+            _memo[key] = result
+            if len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+        else:
+            _memo.move_to_end(key)
+        results.append(result)
+    return results
+
 
 def get_language(text, cld_results=None):
     if cld_results is None:
@@ -16,21 +93,23 @@ def get_score(text, cld_results=None):
 
 
 def detect_language(text):
-    try:
-        detected_language = detect_langs(text.text)[0]
-        return {"language": str(detected_language.lang), "score": float(detected_language.prob)}
-    except LangDetectException:
-        return {"language": "UNKNOWN", "score": 0.0}
+    return detect_languages([text])[0]
 
 
 class LanguageDetector(object):
 
     name = "cld"
 
-    def __init__(self, attrs=("language", "language_score")):
+    def __init__(self, attrs=("language", "language_score"), batch_size=1000):
+        # only the pipeline component needs spaCy, `detect_languages` works without it
+        from spacy.tokens import Doc
+
         self._language, self._score = attrs
-        Doc.set_extension(self._language, getter=get_language)
-        Doc.set_extension(self._score, getter=get_score)
+        self._batch_size = batch_size
+        # Plain attributes, not getters: the results are stored in doc.user_data, so they travel
+        # with the Doc when it is pickled to another process and are never detected again
+        Doc.set_extension(self._language, default=None, force=True)
+        Doc.set_extension(self._score, default=None, force=True)
 
     def __call__(self, doc):
         """Apply the language detector as a pipeline component."""
@@ -39,3 +118,13 @@ class LanguageDetector(object):
         doc._.set(self._language, get_language(doc, cld_results))
         doc._.set(self._score, get_score(doc, cld_results))
         return doc
+
+    def pipe(self, docs, batch_size=None):
+        """Apply the language detector to a stream of documents, used by `nlp.pipe`."""
+        batch_size = batch_size or self._batch_size
+        docs = iter(docs)
+        for batch in iter(lambda: list(itertools.islice(docs, batch_size)), []):
+            for doc, cld_results in zip(batch, detect_languages(batch)):
+                doc._.set(self._language, cld_results["language"])
+                doc._.set(self._score, cld_results["score"])
+                yield doc
@@ -0,0 +1,39 @@
+import functools
+import re
+
+import pandas as pd
+
+from num2words import num2words
+
+# A whole whitespace separated token made of digits
+NUMBER_TOKEN_RE = re.compile(r"(?<!\S)\d+(?!\S)")
+DIGIT_RE = re.compile(r"\d")
+
+# Maximum number of numbers whose conversion is remembered
+NUM2WORDS_CACHE_SIZE = 100000
+
+
+@functools.lru_cache(maxsize=NUM2WORDS_CACHE_SIZE)
+def number_to_words(number: str) -> str:
+    return num2words(number)
+
+
+def _replace_number(match):
+    return number_to_words(match.group(0))
+
+
+def numbers_to_words(texts: pd.Series) -> pd.Series:
+    """
+    Convert the numbers of a column of space separated tokens to words.
+
+    Same output as `texts.apply(canosp2020.preprocessing.apply_num2words)` on whitespace normalized
+    text, but only rows containing a digit are rewritten and every distinct
+    number is converted once.
+
+    :param texts: A Series of preprocessed texts
+    """
+    return pd.Series(
+        [NUMBER_TOKEN_RE.sub(_replace_number, text) if DIGIT_RE.search(text) else text for text in texts],
+        index=texts.index,
+        dtype=texts.dtype,
+    )
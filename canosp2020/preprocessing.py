@@ -7,6 +7,7 @@ import warnings
 import numpy as np
 import pandas as pd
 
+from collections import Counter
 from typing import List, Callable
 from requests_html import HTML
 from pandas import DataFrame
@@ -14,28 +15,43 @@ from nltk import FreqDist
 from gensim.test.utils import common_texts, get_tmpfile
 from gensim.models import Word2Vec
 from tqdm import tqdm
-from num2words import num2words
 
-from .language_dector import LanguageDetector
+from .cache import TicketCache, file_hash, hash_ticket
+from .frequencies import count_tokens, load_frequencies, save_frequencies
+from .html_text import HTMLTextExtractor, html_to_text
+from .instrumentation import Instrumentation, Stage
+from .jobs import PreprocessJob
+from .number_words import number_to_words, numbers_to_words
+from .scheduler import CHUNKS_PER_WORKER, map_chunks, split_balanced
+from .tokens import TokenWriter, load_tokens
+from .worker_pool import SPACY_MODEL, WorkerPool, worker_nlp
 
 # Filter out annoying bs4 warning about URL in the text
 warnings.filterwarnings("ignore", category=UserWarning, module="bs4")
 
 TITLE_CONTENT = "title_content"
 
+# Number of rows of a checkpointed chunk when the input is not read in chunks
+JOB_CHUNKSIZE = 10000
+
+# Bump whenever a change to the pipeline changes its output, so cached tickets get preprocessed again
+PIPELINE_VERSION = 2
+
+
+def parallelize_dataframe(df, func, n_cores=multiprocessing.cpu_count(), pool: WorkerPool = None, stage: Stage = None):
+    if pool is not None:
+        return pd.concat(map_chunks(func, split_balanced(df, pool.n_cores * CHUNKS_PER_WORKER), pool, stage=stage))
 
-def parallelize_dataframe(df, func, n_cores=multiprocessing.cpu_count()):
-    df_split = np.array_split(df, n_cores)
     pool = multiprocessing.Pool(n_cores)
-    df = pd.concat(pool.map(func, df_split))
+    df = pd.concat(map_chunks(func, split_balanced(df, n_cores * CHUNKS_PER_WORKER), pool, stage=stage))
     pool.close()
     pool.join()
     return df
 
 
 def apply_clean_text(df):
-    df.loc[:, "content"] = df["content"].apply(clean_text)
-    df.loc[:, "title"] = df["title"].apply(clean_text)
+    df.loc[:, "content"] = clean_texts(df["content"])
+    df.loc[:, "title"] = clean_texts(df["title"])
     return df
 
 
@@ -57,31 +73,95 @@ def clean_text(text):
     return text
 
 
-def parallelize_spacy_docs(docs, df, func, n_cores=multiprocessing.cpu_count()):
-    docs_split = np.array_split(docs, n_cores)
-    df_split = np.array_split(df, n_cores)
-    pool = multiprocessing.Pool(n_cores)
-    output_df = pd.concat(pool.map(func, zip(docs_split, df_split)))
-    pool.close()
-    pool.join()
-    return output_df
+# The url, ellipsis and quote substitutions of `clean_text` in a single pass.
+# Pairs of quotes are matched after the `‘’` quotes are turned into `'`, like the sequential substitutions do.
+CLEAN_TEXT_RE = re.compile(r"(http[s]?://\S+)|(…)|([„“]|,,|[`‘’‛⸂⸃⸌⸍⸜⸝']{2})|([`‘’‛⸂⸃⸌⸍⸜⸝])")
+CLEAN_TEXT_REPLACEMENTS = ("", "...", '"', "'")
 
 
-def apply_spacy_docs(inputs):
-    docs, df = inputs
-    output_content = []
-    output_lang = []
-    for index, doc in enumerate(docs):
-        lang = doc._.language
-        if lang == "en":
-            output_content.append(" ".join([token.lemma_ for token in doc if not (token.is_punct or token.is_stop)]))
-        else:
-            output_content.append(doc.text)
-        output_lang.append(lang)
-    df["content"] = output_content
-    df["lang"] = output_lang
+def _clean_text_replacement(match):
+    return CLEAN_TEXT_REPLACEMENTS[match.lastindex - 1]
+
+
+def clean_texts(texts):
+    """
+    Clean a whole column of texts, same output as applying `clean_text` to every text.
+
+    HTML is stripped with a streaming `HTMLTextExtractor` instead of building a
+    document with requests_html, texts it does not support go through `clean_text`.
+
+    :param texts: An iterable of raw texts
+    :rtype: A list of cleaned texts
+    """
+    extractor = HTMLTextExtractor()
+    cleaned = []
+    for text in texts:
+        if not text:
+            cleaned.append(text)
+            continue
+        extracted = html_to_text(text, extractor)
+        if extracted is None:
+            cleaned.append(clean_text(text))
+            continue
+        extracted = CLEAN_TEXT_RE.sub(_clean_text_replacement, extracted)
+        cleaned.append(" ".join(extracted.split()).lower())
+    return cleaned
+
+
+def join_lemmas(doc):
+    return " ".join([token.lemma_ for token in doc if not (token.is_punct or token.is_stop)])
+
+
+def lemmatize_batch(inputs):
+    """
+    Run the spaCy pipeline on a batch of texts inside a worker process.
+
+    Only the final strings leave the worker, Doc objects are never pickled.
+
+    :param inputs: A (texts, column) tuple, `column` is either "content" or "title"
+    :rtype: A list of (text, lang) tuples, `lang` is None for titles
+    """
+    texts, column = inputs
+    nlp = worker_nlp()
+    results = []
+    if column == "content":
+        for doc in nlp.pipe(texts, disable=["tagger", "ner", "textcat"]):
+            lang = doc._.language
+            results.append((join_lemmas(doc) if lang == "en" else doc.text, lang))
+    else:
+        for doc in nlp.pipe(texts, disable=["parser", "ner", "textcat", "language_detector"]):
+            results.append((join_lemmas(doc), None))
+    return results
+
+
+def lemmatize_tags(tags):
+    """
+    Lemmatize a batch of tags inside a worker process, see `Preprocess.preprocess_tags`.
+    """
+    nlp = worker_nlp()
+    docs = nlp.pipe(tags, disable=["parser", "ner", "textcat", "language_detector"])
+    return ["".join([token.lemma_ for token in doc if not (token.is_stop)]) for doc in docs]
 
-    return df
+
+def stream_spacy(texts, column, pool, batch_size=500, stage: Stage = None):
+    """
+    Lemmatize texts in the worker processes of `pool`, in order.
+
+    :param texts: An iterable of cleaned texts
+    :param column: Either "content" or "title"
+    :param pool: A `WorkerPool` or an `InlinePool`
+    :param batch_size: Number of texts sent to a worker at once
+    :param stage: A `canosp2020.instrumentation.Stage` recording the timing of every batch
+    :rtype: A generator of (text, lang) tuples
+    """
+    iterator = iter(texts)
+    batches = iter(lambda: (list(itertools.islice(iterator, batch_size)), column), ([], column))
+    if stage is None:
+        batch_results = pool.imap(lemmatize_batch, batches)
+    else:
+        batch_results = stage.collect(pool.imap(stage.timed(lemmatize_batch), batches))
+    for results in batch_results:
+        yield from results
 
 
 def apply_num2words(inputs):
@@ -90,33 +170,161 @@ def apply_num2words(inputs):
     tokens = []
     for token in inputs:
         if token.isnumeric():
-            tokens.append(num2words(token))
+            tokens.append(number_to_words(token))
         else:
             tokens.append(token)
     return " ".join(tokens)
 
 
+def preprocess_df(df: DataFrame, pool, num_2_word=False, instrumentation: Instrumentation = None) -> DataFrame:
+    """
+    The preprocessing pipeline, shared by `Preprocess` and `canosp2020.engine`.
+
+    Every stage is spread over the workers of `pool`, the custom stopwords are
+    the ones of its spaCy model. Inside a worker, an `InlinePool` runs the same
+    stages in the current process.
+
+    :param df: Raw tickets with `title` and `content` columns
+    :param pool: A `WorkerPool` or an `InlinePool`
+    :param num_2_word: Convert numbers to words
+    :param instrumentation: Collects the metrics of every stage
+    :rtype: The tickets with preprocessed `title` and `content`, and the new `lang` and `title_content` columns
+    """
+    instrumentation = instrumentation or Instrumentation([])
+
+    with instrumentation.stage("Pre-preprocess (content)", df["content"]) as stage:
+        df = parallelize_dataframe(df, apply_clean_text, pool=pool, stage=stage)
+
+    # Run spacy pipeline, remove punct, stopwords, lemmatizer on `content`
+    with instrumentation.stage("Spacy stream (content)", df["content"]) as stage:
+        content, lang = [], []
+        for text, text_lang in stream_spacy(df["content"], "content", pool, stage=stage):
+            content.append(text)
+            lang.append(text_lang)
+        df["content"] = content
+        df["lang"] = lang
+
+    # Run spacy pipeline, remove punct, stopwords, lemmatizer on `title`
+    with instrumentation.stage("Spacy stream (title)", df["title"]) as stage:
+        df.loc[:, "title"] = [text for text, _ in stream_spacy(df["title"], "title", pool, stage=stage)]
+
+    # convert number to word on `content` and `title`
+    if num_2_word:
+        with instrumentation.stage("Final cleanup (title and content)", df["content"]):
+            df["title"] = numbers_to_words(df["title"])
+            df["content"] = numbers_to_words(df["content"])
+
+    # Merge `title` and `content` column into a new column
+    df[TITLE_CONTENT] = df["title"] + " " + df["content"]
+    return df
+
+
 class Preprocess:
     """
     Preprocess text documents with spacy.
 
     :param csv_file: Path to input csv file
     :param stopwords: A list of custom stopwords
-
-    >>> preprocessor = Preprocess("data/tickets.csv")
-    >>> preprocessor.preprocess_tickets()
+    :param num_2_word: Convert numbers to words
+    :param cache_file: Path to a cache of preprocessed tickets, only new
+        or changed tickets are preprocessed when it is set
+    :param cache_size: Maximum number of tickets kept in the cache
+    :param n_cores: Number of worker processes
+    :param chunksize: Read and preprocess the input `chunksize` rows at a time
+        instead of loading the whole file, see `preprocess_to_files`
+    :param instrumentation: Collects the metrics of every stage, see
+        `canosp2020.instrumentation`, they are printed by default
+    :param work_dir: Checkpoint every preprocessed chunk in this directory, a
+        run that died is resumed from the chunks already done, see `canosp2020.jobs`
+
+    The worker processes are started on first use and reused by every parallel
+    stage until `close` is called, or the `with` block exits.
+
+    >>> with Preprocess("data/tickets.csv", n_cores=4) as preprocessor:
+    ...     preprocessor.preprocess_tickets()
+
+    >>> with Preprocess("data/tickets.csv", cache_file="data/.preprocess_cache.sqlite") as preprocessor:
+    ...     preprocessor.preprocess_tickets()
+
+    >>> with Preprocess("data/tickets.csv", chunksize=10000) as preprocessor:
+    ...     preprocessor.preprocess_to_files("data/tickets_preprocessed.csv", "data/tickets_tokens.parquet")
+
+    >>> with Preprocess("data/tickets.csv", work_dir="data/.preprocess_job") as preprocessor:
+    ...     preprocessor.preprocess_tickets()  # run again after a crash to resume
+
+    >>> from canosp2020.instrumentation import Instrumentation, JSONLinesWriter
+    >>> instrumentation = Instrumentation([JSONLinesWriter("data/preprocess_metrics.jsonl")])
+    >>> with Preprocess("data/tickets.csv", instrumentation=instrumentation) as preprocessor:
+    ...     preprocessor.preprocess_tickets()
     """
 
-    def __init__(self, csv_file: str, stopwords: List[str] = None, num_2_word=False):
-        self._df = pd.read_csv(csv_file)
-        self._nlp = spacy.load("en_core_web_sm")
+    def __init__(
+        self,
+        csv_file: str,
+        stopwords: List[str] = None,
+        num_2_word=False,
+        cache_file: str = None,
+        cache_size: int = 1000000,
+        n_cores: int = multiprocessing.cpu_count(),
+        chunksize: int = None,
+        instrumentation: Instrumentation = None,
+        work_dir: str = None,
+    ):
+        self._csv_file = csv_file
+        self._chunksize = chunksize
+        self._work_dir = work_dir
+        # In chunked mode the input is only read while preprocessing
+        self._df = None if chunksize else self._read_df(pd.read_csv(csv_file))
+        # Set once `preprocess_tickets` replaced the dataframe by the preprocessed tickets
+        self._preprocessed = False
+        self._nlp = spacy.load(SPACY_MODEL)
         self._num_2_word = num_2_word
+        self._stopwords = sorted(set(stopwords)) if stopwords else []
+        self._cache = TicketCache(cache_file, max_entries=cache_size) if cache_file else None
+        self._pool = WorkerPool(n_cores, SPACY_MODEL, self._stopwords)
+        self.instrumentation = instrumentation or Instrumentation()
+
+    @staticmethod
+    def _read_df(df):
+        df["title"] = df["title"].astype(str)
+        df["content"] = df["content"].astype(str)
+        return df
+
+    @property
+    def pool(self) -> WorkerPool:
+        """
+        The worker pool shared by every parallel stage, see `preprocess_tags`.
+        """
+        return self._pool
+
+    def close(self):
+        """
+        Stop the worker processes and close the cache.
+        """
+        self._pool.close()
+        if self._cache is not None:
+            self._cache.close()
+
+    def __enter__(self):
+        return self
 
-        self._df["title"] = self._df["title"].astype(str)
-        self._df["content"] = self._df["content"].astype(str)
+    def __exit__(self, *exc):
+        self.close()
 
-        if stopwords:
-            self._nlp.Defaults.stop_words |= set(stopwords)
+    def fingerprint(self) -> str:
+        """
+        Describe everything besides the raw text that changes the output of the pipeline.
+        """
+        return "|".join(
+            [
+                str(PIPELINE_VERSION),
+                spacy.__version__,
+                self._nlp.meta.get("name", ""),
+                self._nlp.meta.get("version", ""),
+                f"num_2_word={self._num_2_word}",
+                ",".join(self._stopwords),
+            ]
+        )
 
     def preprocess_tickets(self):
         """
@@ -138,95 +346,235 @@ class Preprocess:
         which consists content from both title and content
 
         Add new `lang` column.
+
+        When a cache is configured, tickets found in the cache are not
+        preprocessed again.
+
+        In chunked mode the preprocessed chunks are concatenated into the
+        dataframe, use `preprocess_to_files` to keep the memory usage bounded.
+
+        With a work directory, the chunks are only concatenated once every
+        one of them is done.
+
+        The tickets are only preprocessed once, the writers reuse the dataframe afterwards.
         """
-        import time
+        if self._preprocessed:
+            return
+        if self._work_dir:
+            job = self._job()
+            for _ in self._iter_job_chunks(job, load_done=False):
+                pass
+            self._df = job.assemble()
+        elif self._chunksize:
+            self._df = pd.concat(list(self.iter_preprocessed_chunks()))
+        else:
+            self._df = self._preprocess_chunk(self._df)
+        self._preprocessed = True
 
-        language_detector = LanguageDetector()
-        self._nlp.add_pipe(language_detector, name="language_detector")
+    def iter_preprocessed_chunks(self):
+        """
+        Read the input `chunksize` rows at a time and preprocess every chunk.
 
-        # Add new lang column with default value of `en`
-        start_time = time.time()
-        self._df = parallelize_dataframe(self._df, apply_clean_text)
-        print(f"Pre-preprocess (content): {time.time() - start_time} sec")
+        After `preprocess_tickets`, the preprocessed dataframe is yielded as is.
 
-        # Run spacy pipeline on `content` column
-        start_time = time.time()
-        content_docs = list(
-            self._nlp.pipe(
-                self._df["content"], disable=["tagger", "ner", "textcat"], n_process=multiprocessing.cpu_count()
-            )
-        )
-        print(f"Spacy pipe (content): {time.time() - start_time} sec")
-
-        # Remove punct, stopwords, lemmatizer on `content`
-        start_time = time.time()
-        self._df = parallelize_spacy_docs(content_docs, self._df, apply_spacy_docs)
-        print(f"Final cleanup (content): {time.time() - start_time} sec")
-
-        # Run spacy pipeline on `title` column
-        self._nlp.remove_pipe("language_detector")
-        title_docs = list(
-            self._nlp.pipe(
-                self._df["title"], disable=["parser", "ner", "textcat"], n_process=multiprocessing.cpu_count()
-            )
-        )
+        :rtype: A generator of preprocessed dataframes
+        """
+        if self._preprocessed:
+            yield self._df
+            return
+
+        if self._work_dir:
+            yield from self._iter_job_chunks(self._job())
+            return
+
+        if not self._chunksize:
+            yield self._preprocess_chunk(self._df)
+            return
+
+        for chunk in pd.read_csv(self._csv_file, chunksize=self._chunksize):
+            yield self._preprocess_chunk(self._read_df(chunk))
+
+    def _job(self) -> PreprocessJob:
+        config = {"fingerprint": self.fingerprint(), "chunksize": self._chunksize or JOB_CHUNKSIZE}
+        return PreprocessJob(self._work_dir, self._csv_file, config)
+
+    def _iter_job_chunks(self, job: PreprocessJob, load_done=True):
+        """
+        Preprocess the chunks missing from the work directory and checkpoint them.
 
-        # Remove punct, stopwords, lemmatizer on `title`
-        start_time = time.time()
-        self._df.loc[:, "title"] = [
-            " ".join([token.lemma_ for token in doc if not (token.is_punct or token.is_stop)]) for doc in title_docs
-        ]
-        print(f"Final cleanup (title): {time.time() - start_time} sec")
+        :param job: The job of the work directory
+        :param load_done: Also load and yield the chunks done by a previous run
+        """
+        chunksize = self._chunksize or JOB_CHUNKSIZE
+        if self._df is not None:
+            n_rows = len(self._df)
+            chunks = (self._df.iloc[start : start + chunksize].copy() for start in range(0, n_rows, chunksize))
+        else:
+            n_rows = sum(len(chunk) for chunk in pd.read_csv(self._csv_file, usecols=[0], chunksize=chunksize))
+            chunks = (self._read_df(chunk) for chunk in pd.read_csv(self._csv_file, chunksize=chunksize))
+
+        job.start([(start, min(start + chunksize, n_rows)) for start in range(0, n_rows, chunksize)])
+        for index, chunk in enumerate(chunks):
+            if job.is_done(index):
+                if load_done:
+                    yield job.load_chunk(index)
+                continue
+            chunk = self._preprocess_chunk(chunk)
+            job.save_chunk(index, chunk)
+            yield chunk
+
+    def preprocess_to_files(self, csv_file: str = None, parquet_file: str = None):
+        """
+        Preprocess the tickets once and write them to a CSV file, to a Parquet
+        file as lists of tokens, see `canosp2020.tokens`, or to both.
+
+        In chunked mode every chunk is appended to the outputs as soon as it is
+        preprocessed, so the memory usage does not depend on the input size.
+
+        :param csv_file: Path to output csv file
+        :param parquet_file: Path to output parquet file
+        """
+        output_files = ", ".join(path for path in (csv_file, parquet_file) if path)
+        token_writer = TokenWriter(parquet_file) if parquet_file else None
+        num_tickets = 0
+        try:
+            for index, chunk in enumerate(self.iter_preprocessed_chunks()):
+                if csv_file:
+                    chunk.to_csv(csv_file, mode="w" if index == 0 else "a", header=index == 0, index=False)
+                if token_writer is not None:
+                    token_writer.write(chunk)
+                num_tickets += len(chunk)
+                print(f"Wrote {num_tickets} tickets to {output_files}")
+        finally:
+            if token_writer is not None:
+                token_writer.close()
+
+    def preprocess_to_csv(self, output_file: str):
+        """
+        Preprocess the tickets and write them to a CSV file, see `preprocess_to_files`.
 
-        # convert number to word on `content` and `title`
-        if self._num_2_word:
-            start_time = time.time()
-            self._df["title"] = self._df["title"].apply(apply_num2words)
-            self._df["content"] = self._df["content"].apply(apply_num2words)
-            print(f"Final cleanup (title and content): {time.time() - start_time} sec")
+        :param output_file: Path to output csv file
+        """
+        self.preprocess_to_files(csv_file=output_file)
+
+    def preprocess_to_parquet(self, output_file: str):
+        """
+        Preprocess the tickets and write them to a Parquet file as lists of
+        tokens, see `preprocess_to_files`.
 
-        # Merge `title` and `content` column into a new column
-        self._df["title_content"] = self._df["title"] + " " + self._df["content"]
+        :param output_file: Path to output parquet file
+        """
+        self.preprocess_to_files(parquet_file=output_file)
+
+    def _preprocess_chunk(self, df):
+        if self._cache is None:
+            return self._preprocess_df(df)
+        return self._preprocess_df_cached(df)
+
+    def _preprocess_df_cached(self, df):
+        fingerprint = self.fingerprint()
+        # the cache statistics are reported with the metrics of the cache stages
+        with self.instrumentation.stage("Cache lookup", df["content"]) as stage:
+            keys = pd.Series(
+                [hash_ticket(title, content, fingerprint) for title, content in zip(df["title"], df["content"])],
+                index=df.index,
+            )
+            cached = self._cache.get_many(list(keys))
+            stage.extra = self._cache.stats()
+
+        # Only preprocess the first occurrence of every new or changed ticket
+        todo = ~keys.isin(list(cached)) & ~keys.duplicated()
+        if todo.any():
+            processed = self._preprocess_df(df[todo].copy())
+            with self.instrumentation.stage("Cache update", processed["content"]) as stage:
+                entries = list(zip(keys[todo], processed["title"], processed["content"], processed["lang"]))
+                self._cache.put_many(entries)
+                cached.update((key, (title, content, lang)) for key, title, content, lang in entries)
+                stage.extra = self._cache.stats()
+
+        df = df.copy()
+        df["title"] = [cached[key][0] for key in keys]
+        df["content"] = [cached[key][1] for key in keys]
+        df["lang"] = [cached[key][2] for key in keys]
+        df[TITLE_CONTENT] = df["title"] + " " + df["content"]
+        return df
+
+    def _preprocess_df(self, df):
+        return preprocess_df(df, self._pool, self._num_2_word, self.instrumentation)
 
     @staticmethod
-    def preprocess_tags(tags):
-        nlp = spacy.load("en_core_web_sm")
-        docs = nlp.pipe(tags, disable=["parser", "ner", "textcat"], n_process=multiprocessing.cpu_count())
-        tags = ["".join([token.lemma_ for token in doc if not (token.is_stop)]) for doc in docs]
-        return list(filter(None, tags))
+    def preprocess_tags(tags, pool: WorkerPool = None, batch_size=1000):
+        """
+        Lemmatize tags and remove their stop words, tags left empty are dropped.
+
+            >>> with Preprocess("data/tickets.csv") as preprocessor:
+            ...     tags = Preprocess.preprocess_tags(tags, preprocessor.pool)
+
+        :param tags: A list of tags
+        :param pool: A `WorkerPool`, a pool is started for the call by default
+        :param batch_size: Number of tags sent to a worker at once
+        """
+        if pool is None:
+            with WorkerPool() as pool:
+                return Preprocess.preprocess_tags(tags, pool, batch_size)
+
+        tags = iter(tags)
+        batches = iter(lambda: list(itertools.islice(tags, batch_size)), [])
+        return [tag for batch in pool.imap(lemmatize_tags, batches) for tag in batch if tag]
 
     @staticmethod
-    def get_stop_words(input_file="data/tickets_word2vec.model", threshold=0.02) -> List[str]:
+    def get_stop_words(
+        input_file="data/tickets_word2vec.model",
+        threshold=0.02,
+        n_cores=multiprocessing.cpu_count(),
+        batch_size=1000,
+    ) -> List[str]:
         """
         Get a list of step words base on relative frequency.
-        The input could either be the raw CSV file or word2vec model build with genism.
-        The input format will be determined by the input_file extension <filename>.[csv|model].
+        The input could either be the raw CSV file, the token dataset written by
+        `Preprocess.preprocess_to_parquet` or word2vec model build with genism.
+        The input format will be determined by the input_file extension <filename>.[csv|parquet|model].
+        The word frequencies of a CSV file are stored in <filename>.csv.freq.json,
+        so the file is only tokenized again when its content changes.
         The `eval` method is a function which takes a float variable,
         word frequency, as a single argument and return a boolean value
         which represent whether a word is a stop word or not.
         By default, we consider the words within the top 2 percentile as stop words.
             >>> from canosp2020.preprocessing import Preprocess
             >>> stopwords = Preprocess.get_stop_words(input_file="data/tickets_word2vec.model", eval=lambda x: x <= 0.2)
-        :param input_file: Path to tickets data csv file or genism word2vec model.
+        :param input_file: Path to tickets data csv file, token parquet file or genism word2vec model.
         :param eval: A function to evaluate whether a word is stop word of not
+        :param n_cores: Number of processes tokenizing a CSV file
+        :param batch_size: Number of texts sent to a worker at once
         :rtype: A list of words.
         """
         _, extension = os.path.splitext(os.path.basename(input_file))
 
         if extension == ".csv":
-            nlp = spacy.load("en_core_web_sm")
-
-            # Load csv file and merge title and content column
-            df = pd.read_csv(input_file)
-            df[TITLE_CONTENT] = df["title"] + " " + df["content"]
-            df[TITLE_CONTENT].replace("", np.nan, inplace=True)
-            df.dropna(subset=[TITLE_CONTENT], inplace=True)
-            docs = list(nlp.pipe(df["title_content"], disable=["tagger", "parser", "ner"]))
-            sents = [[token.text for token in doc] for doc in docs]
-            big_words = itertools.chain(*sents)
+            # The frequency table is cached next to the csv file until its content changes
+            fingerprint = f"{file_hash(input_file)}:{SPACY_MODEL}"
+            counter = load_frequencies(input_file, fingerprint)
+            if counter is None:
+                # Load csv file and merge title and content column
+                df = pd.read_csv(input_file)
+                df[TITLE_CONTENT] = df["title"] + " " + df["content"]
+                df[TITLE_CONTENT].replace("", np.nan, inplace=True)
+                df.dropna(subset=[TITLE_CONTENT], inplace=True)
+
+                # Count tokens in parallel, merging the counters in order keeps ties in first seen order
+                texts = iter(df[TITLE_CONTENT].tolist())
+                batches = iter(lambda: list(itertools.islice(texts, batch_size)), [])
+                counter = Counter()
+                with WorkerPool(n_cores) as pool:
+                    for batch_counter in pool.imap(count_tokens, batches):
+                        counter.update(batch_counter)
+                save_frequencies(input_file, fingerprint, counter)
 
             # Build frequency distribution
-            fdist = FreqDist(big_words)
+            fdist = FreqDist(counter)
+
+        elif extension == ".parquet":
+            fdist = FreqDist(itertools.chain.from_iterable(load_tokens(input_file)))
 
         elif extension == ".model":
             model = Word2Vec.load(input_file)
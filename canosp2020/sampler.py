@@ -0,0 +1,68 @@
+import random
+
+from typing import Any, Dict, Hashable, List
+
+
+class StratifiedSampler:
+    """
+    Draw items without replacement from a stream, stratified by a key.
+
+    Every stratum keeps a reservoir of at most `capacity` items while the
+    stream goes by, so each item seen has the same chance to be in its
+    reservoir. `sample` then splits the requested number of items between the
+    strata in proportion to their sizes, and draws them from the reservoirs.
+
+    :param capacity: Maximum number of items drawn by `sample`
+    :param rng: Random number generator
+
+    >>> sampler = StratifiedSampler(2000, random.Random(42))
+    >>> for ticket in tickets:
+    ...     sampler.add(num_human_taggers(ticket), ticket)
+    >>> sample = sampler.sample(1500)
+    """
+
+    def __init__(self, capacity: int, rng: random.Random = None):
+        self.capacity = capacity
+        self._random = rng or random.Random()
+        self.sizes = {}  # number of items seen per stratum
+        self._reservoirs = {}
+
+    def add(self, stratum: Hashable, item: Any):
+        size = self.sizes.get(stratum, 0) + 1
+        self.sizes[stratum] = size
+        reservoir = self._reservoirs.setdefault(stratum, [])
+        if len(reservoir) < self.capacity:
+            reservoir.append(item)
+        else:
+            index = self._random.randrange(size)
+            if index < self.capacity:
+                reservoir[index] = item
+
+    def allocation(self, k: int) -> Dict[Hashable, int]:
+        """
+        Number of items drawn from every stratum, proportional to the stratum sizes.
+
+        Fractions are rounded with the largest remainder method, so the counts add up to k.
+        """
+        total = sum(self.sizes.values())
+        k = min(k, self.capacity, total)
+        if k == 0:
+            return {stratum: 0 for stratum in self.sizes}
+
+        shares = {stratum: k * size / total for stratum, size in self.sizes.items()}
+        counts = {stratum: int(share) for stratum, share in shares.items()}
+        remaining = k - sum(counts.values())
+        for stratum in sorted(shares, key=lambda stratum: counts[stratum] - shares[stratum])[:remaining]:
+            counts[stratum] += 1
+        return counts
+
+    def sample(self, k: int) -> List[Any]:
+        """
+        Draw k items, or every item if fewer were seen.
+
+        :rtype: The items, grouped by stratum
+        """
+        sample = []
+        for stratum, count in self.allocation(k).items():
+            sample += self._random.sample(self._reservoirs[stratum], count)
+        return sample
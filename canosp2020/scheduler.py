@@ -0,0 +1,113 @@
+import numpy as np
+
+from pandas import DataFrame
+from typing import Any, Callable, List, Sequence, Tuple
+
+from .instrumentation import Stage
+
+# Number of chunks cut for every worker, more chunks keep the workers busy until the end
+CHUNKS_PER_WORKER = 8
+
+TEXT_COLUMNS = ("title", "content")
+
+
+def balanced_bounds(lengths: Sequence[int], n_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Cut a sequence of documents into contiguous chunks of about the same number of characters.
+
+    A document longer than a chunk ends up alone in its own chunk.
+
+    :param lengths: Length of every document
+    :param n_chunks: Maximum number of chunks
+    :rtype: A list of (start, end) row ranges covering every document in order
+    """
+    if len(lengths) == 0:
+        return [(0, 0)]
+    # every document costs a little on top of its characters
+    cumulative = np.cumsum(np.asarray(lengths, dtype=np.int64) + 1)
+    targets = cumulative[-1] * np.arange(1, n_chunks) / n_chunks
+    # cut before or after the document a target falls in, whichever is closer
+    crossing = np.searchsorted(cumulative, targets)
+    before = np.where(crossing > 0, cumulative[np.maximum(crossing - 1, 0)], 0)
+    cuts = np.unique(np.where(targets - before < cumulative[crossing] - targets, crossing, crossing + 1))
+    bounds = [0] + [int(cut) for cut in cuts if 0 < cut < len(lengths)] + [len(lengths)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def text_lengths(df: DataFrame, columns: Sequence[str] = TEXT_COLUMNS) -> np.ndarray:
+    lengths = np.zeros(len(df), dtype=np.int64)
+    for column in columns:
+        if column in df:
+            lengths += df[column].str.len().fillna(0).to_numpy(dtype=np.int64)
+    return lengths
+
+
+def split_balanced(df: DataFrame, n_chunks: int, columns: Sequence[str] = TEXT_COLUMNS) -> List[DataFrame]:
+    """
+    Split a dataframe into contiguous chunks of about the same number of characters.
+
+    :param df: A dataframe of documents
+    :param n_chunks: Maximum number of chunks
+    :param columns: Text columns whose length is balanced
+    """
+    return [df.iloc[start:end] for start, end in balanced_bounds(text_lengths(df, columns), n_chunks)]
+
+
+class _Indexed:
+    """Picklable wrapper keeping track of which chunk a result belongs to."""
+
+    def __init__(self, func: Callable):
+        self.func = func
+
+    def __call__(self, inputs):
+        index, chunk = inputs
+        return index, self.func(chunk)
+
+
+def map_chunks(
+    func: Callable,
+    chunks: Sequence,
+    pool,
+    weights: Sequence[int] = None,
+    stage: Stage = None,
+    prepare: Callable[[Any], Any] = None,
+    callback: Callable[[int, Any], None] = None,
+) -> List:
+    """
+    Apply `func` to every chunk on the workers of `pool` and return the results in chunk order.
+
+    The heaviest chunks are dispatched first, one chunk at a time, so a worker
+    pulls the next chunk as soon as it is idle and the long chunks do not
+    end up running alone at the end.
+
+        >>> chunks = split_balanced(df, pool.n_cores * CHUNKS_PER_WORKER)
+        >>> df = pd.concat(map_chunks(apply_clean_text, chunks, pool))
+
+    :param func: A picklable function applied to every chunk
+    :param chunks: The chunks, in order
+    :param pool: A `WorkerPool` or a `multiprocessing.Pool`
+    :param weights: Cost of every chunk, the number of characters by default for dataframes
+    :param stage: A `canosp2020.instrumentation.Stage` recording the timing of every chunk
+    :param prepare: Convert every chunk before it is sent to a worker, for example to serialize it
+    :param callback: Called with the index and the result of every chunk as soon as it is done,
+        the results are then not kept
+    """
+    if weights is None:
+        weights = [int(text_lengths(chunk).sum()) if isinstance(chunk, DataFrame) else 1 for chunk in chunks]
+    order = sorted(range(len(chunks)), key=lambda index: -weights[index])
+    prepare = prepare or (lambda chunk: chunk)
+    tasks = ((index, prepare(chunks[index])) for index in order)
+
+    func = _Indexed(func)
+    if stage is None:
+        results = pool.imap_unordered(func, tasks, chunksize=1)
+    else:
+        results = stage.collect(pool.imap_unordered(stage.timed(func), tasks, chunksize=1))
+
+    ordered = [None] * len(chunks)
+    for index, result in results:
+        if callback is None:
+            ordered[index] = result
+        else:
+            callback(index, result)
+    return ordered
@@ -0,0 +1,3 @@
+# SQLite limits the number of host parameters in a single statement,
+# so the ticket store and the ticket cache query and write keys in batches of this size
+SQLITE_BATCH_SIZE = 500
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .json_stream import read_json_tickets
+from .sqlite_limits import SQLITE_BATCH_SIZE
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS tickets (ticket_id INTEGER PRIMARY KEY, title TEXT, content TEXT, timestamp INTEGER)",
+    "CREATE TABLE IF NOT EXISTS taggers (tagger_id TEXT PRIMARY KEY, is_expert INTEGER, is_sumo INTEGER)",
+    # one row per ticket tagged by a tagger, even without any tag
+    "CREATE TABLE IF NOT EXISTS annotations (ticket_id INTEGER, tagger_id TEXT, PRIMARY KEY (ticket_id, tagger_id))",
+    "CREATE TABLE IF NOT EXISTS tags "
+    "(ticket_id INTEGER, tagger_id TEXT, position INTEGER, tag TEXT, PRIMARY KEY (ticket_id, tagger_id, position))",
+    "CREATE INDEX IF NOT EXISTS tickets_timestamp ON tickets (timestamp)",
+    "CREATE INDEX IF NOT EXISTS annotations_tagger_id ON annotations (tagger_id)",
+    "CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag)",
+]
+
+
+class TicketStore:
+    """
+    Tickets, tags and taggers stored in a SQLite file.
+
+    Tickets are upserted in bulk: a ticket replaces the title, content,
+    timestamp and the tags of the taggers it has tags for, tags of other
+    taggers are kept. So SUMO tags can be refreshed by the fetcher without
+    losing the crowdsourced tags added by the merger.
+
+    :param path: Path to the database file
+
+    >>> with TicketStore("data/tickets.db") as store:
+    ...     store.upsert_tickets(tickets)
+    ...     for ticket in store.iter_tickets(tagger_id="3", since=1579000000, tag="crash"):
+    ...         print(ticket["title"])
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._path = path
+        self._conn = sqlite3.connect(path)
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert_taggers(self, taggers: Iterable[Dict]):
+        """
+        :param taggers: Taggers in the format of the `taggers` list of `data/tickets.json`
+        """
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO taggers (tagger_id, is_expert, is_sumo) VALUES (?, ?, ?)",
+            [(str(tagger["tagger_id"]), bool(tagger["is_expert"]), bool(tagger["is_sumo"])) for tagger in taggers],
+        )
+        self._conn.commit()
+
+    def upsert_tickets(self, tickets: Iterable[Dict], batch_size: int = SQLITE_BATCH_SIZE):
+        """
+        :param tickets: Tickets in the format of `data/tickets.json`
+        :param batch_size: Number of tickets written per transaction
+        """
+        batch = []
+        for ticket in tickets:
+            batch.append(ticket)
+            if len(batch) == batch_size:
+                self._upsert_batch(batch)
+                batch = []
+        if batch:
+            self._upsert_batch(batch)
+
+    def _upsert_batch(self, tickets):
+        ticket_rows, annotation_rows, tag_rows = [], [], []
+        for ticket in tickets:
+            ticket_id = int(ticket["ticket_id"])
+            ticket_rows.append((ticket_id, ticket["title"], ticket["content"], int(ticket["timestamp"])))
+            for tagger_id, tags in ticket["tags"].items():
+                annotation_rows.append((ticket_id, str(tagger_id)))
+                tag_rows.extend((ticket_id, str(tagger_id), position, tag) for position, tag in enumerate(tags))
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tickets (ticket_id, title, content, timestamp) VALUES (?, ?, ?, ?)",
+                ticket_rows,
+            )
+            self._conn.executemany("DELETE FROM tags WHERE ticket_id = ? AND tagger_id = ?", annotation_rows)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO annotations (ticket_id, tagger_id) VALUES (?, ?)", annotation_rows
+            )
+            self._conn.executemany(
+                "INSERT INTO tags (ticket_id, tagger_id, position, tag) VALUES (?, ?, ?, ?)", tag_rows
+            )
+
+    def taggers(self) -> List[Dict]:
+        # numeric ids in numeric order, whatever order the taggers were upserted in
+        rows = self._conn.execute(
+            "SELECT tagger_id, is_expert, is_sumo FROM taggers ORDER BY CAST(tagger_id AS INTEGER), tagger_id"
+        )
+        return [
+            {"tagger_id": tagger_id, "is_expert": bool(is_expert), "is_sumo": bool(is_sumo)}
+            for tagger_id, is_expert, is_sumo in rows
+        ]
+
+    def iter_tickets(
+        self, tagger_id: str = None, since: int = None, until: int = None, tag: str = None
+    ) -> Iterator[Dict]:
+        """
+        Stream tickets ordered by ticket_id.
+
+        :param tagger_id: Only tickets annotated by this tagger
+        :param since: Only tickets created at or after this epoch timestamp
+        :param until: Only tickets created before this epoch timestamp
+        :param tag: Only tickets with this tag, from any tagger
+        :rtype: A generator of tickets in the format of `data/tickets.json`
+        """
+        conditions, params = [], []
+        if tagger_id is not None:
+            conditions.append("ticket_id IN (SELECT ticket_id FROM annotations WHERE tagger_id = ?)")
+            params.append(str(tagger_id))
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if tag is not None:
+            conditions.append("ticket_id IN (SELECT ticket_id FROM tags WHERE tag = ?)")
+            params.append(tag)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # a separate cursor, so the tags can be queried while the tickets are read
+        cursor = self._conn.cursor()
+        cursor.execute(f"SELECT ticket_id, title, content, timestamp FROM tickets {where} ORDER BY ticket_id", params)
+        while True:
+            rows = cursor.fetchmany(SQLITE_BATCH_SIZE)
+            if not rows:
+                break
+            tags = self._tags([row[0] for row in rows])
+            for ticket_id, title, content, timestamp in rows:
+                yield {
+                    "ticket_id": str(ticket_id),
+                    "title": title,
+                    "content": content,
+                    "timestamp": timestamp,
+                    "tags": tags.get(ticket_id, {}),
+                }
+
+    def _tags(self, ticket_ids: List[int]) -> Dict[int, Dict[str, List[str]]]:
+        placeholders = ",".join("?" * len(ticket_ids))
+        tags = {}
+        rows = self._conn.execute(
+            f"SELECT ticket_id, tagger_id FROM annotations WHERE ticket_id IN ({placeholders}) ORDER BY rowid",
+            ticket_ids,
+        )
+        for ticket_id, tagger_id in rows:
+            tags.setdefault(ticket_id, {})[tagger_id] = []
+        rows = self._conn.execute(
+            f"SELECT ticket_id, tagger_id, tag FROM tags WHERE ticket_id IN ({placeholders}) "
+            "ORDER BY ticket_id, tagger_id, position",
+            ticket_ids,
+        )
+        for ticket_id, tagger_id, tag in rows:
+            tags[ticket_id][tagger_id].append(tag)
+        return tags
+
+    def close(self):
+        self._conn.close()
+
+
+def read_tickets(path) -> Tuple[List[Dict], Iterable[Dict]]:
+    """
+    Read the taggers and tickets of a tickets JSON file or of a `TicketStore`.
+
+    :param path: Path to `data/tickets.json` or to a `.db` store
+    :rtype: A (taggers, tickets) tuple
+    """
+    if os.path.splitext(str(path))[1] == ".db":
+        with TicketStore(str(path)) as store:
+            taggers = store.taggers()
+        return taggers, _iter_store(str(path))
+
+    return read_json_tickets(path)
+
+
+def _iter_store(path) -> Iterator[Dict]:
+    # the store is closed once the tickets are read, or when the generator is closed
+    with TicketStore(path) as store:
+        yield from store.iter_tickets()
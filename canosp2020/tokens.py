@@ -0,0 +1,93 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from typing import List
+
+TOKEN_COLUMNS = ["title", "content", "title_content"]
+
+
+def to_token_table(df) -> pa.Table:
+    """
+    Convert preprocessed tickets into a table of token lists.
+
+    The table has one `<column>_tokens` list column for every preprocessed
+    text column, plus the `lang` column and the ticket `id` when present.
+
+    :param df: A dataframe produced by `Preprocess`
+    """
+    columns = {}
+    if "id" in df:
+        columns["id"] = pa.array(df["id"])
+    if "lang" in df:
+        columns["lang"] = pa.array(df["lang"], type=pa.string())
+    for column in TOKEN_COLUMNS:
+        if column in df:
+            columns[f"{column}_tokens"] = pa.array(
+                [text.split() if isinstance(text, str) else [] for text in df[column]], type=pa.list_(pa.string())
+            )
+    return pa.table(columns)
+
+
+class TokenWriter:
+    """
+    Append preprocessed tickets to a Parquet file as token lists.
+
+    :param path: Path to output parquet file
+
+    >>> with TokenWriter("data/tickets_tokens.parquet") as writer:
+    ...     for chunk in chunks:
+    ...         writer.write(chunk)
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._writer = None
+
+    def write(self, df):
+        table = to_token_table(df)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._path, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_tokens(path: str, columns: List[str] = None):
+    """
+    Load a token dataset written by `TokenWriter` into a dataframe.
+
+    :param path: Path to the parquet file
+    :param columns: Columns to load, all of them by default
+    """
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def load_tokens(path: str, column: str = "title_content", lang: str = None) -> List[List[str]]:
+    """
+    Load the tokens of every ticket without tokenizing the text again.
+
+        >>> from canosp2020.tokens import load_tokens
+        >>> sents = load_tokens("data/tickets_tokens.parquet")
+
+    :param path: Path to the parquet file
+    :param column: One of "title", "content" or "title_content"
+    :param lang: Only load tickets of this language
+    :rtype: A list of token lists
+    """
+    token_column = f"{column}_tokens"
+    table = pq.read_table(path, columns=[token_column] + (["lang"] if lang else []))
+    if lang:
+        table = table.filter(pc.equal(table["lang"], lang))
+    return table[token_column].to_pylist()
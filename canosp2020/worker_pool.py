@@ -0,0 +1,122 @@
+import multiprocessing
+import spacy
+
+from typing import List
+
+from .language_dector import LanguageDetector
+
+SPACY_MODEL = "en_core_web_sm"
+
+# spaCy models already loaded in this process, see `load_nlp`
+_models = {}
+
+# spaCy model of a worker process, see `init_worker`
+_worker_nlp = None
+
+
+def load_nlp(model: str = SPACY_MODEL, stopwords: List[str] = None):
+    """
+    Load a spaCy model with the language detector once per process.
+
+    :param model: Name of the spaCy model
+    :param stopwords: A list of custom stopwords
+    """
+    key = (model, tuple(sorted(set(stopwords))) if stopwords else ())
+    if key not in _models:
+        nlp = spacy.load(model)
+        # flag the lexemes of this model only, changing `Defaults.stop_words` would
+        # change every other model of the language loaded in the process
+        for word in stopwords or []:
+            for variant in {word, word.lower(), word.capitalize(), word.upper()}:
+                nlp.vocab[variant].is_stop = True
+        nlp.add_pipe(LanguageDetector(), name="language_detector")
+        _models[key] = nlp
+    return _models[key]
+
+
+def init_worker(model: str = SPACY_MODEL, stopwords: List[str] = None):
+    global _worker_nlp
+    _worker_nlp = load_nlp(model, stopwords)
+
+
+def worker_nlp():
+    """
+    The spaCy model of the current worker process.
+    """
+    if _worker_nlp is None:
+        init_worker()
+    return _worker_nlp
+
+
+class WorkerPool:
+    """
+    Long-lived pool of worker processes.
+
+    Every worker loads the spaCy model and the language detector once when it
+    starts, so the pool can be shared by all the parallel stages and reused
+    between batches without paying the startup cost again.
+    The processes are only started on first use.
+
+    :param n_cores: Number of worker processes
+    :param model: Name of the spaCy model
+    :param stopwords: A list of custom stopwords
+
+    >>> with WorkerPool() as pool:
+    ...     pool.map(func, chunks)
+    """
+
+    def __init__(self, n_cores: int = multiprocessing.cpu_count(), model: str = SPACY_MODEL, stopwords=None):
+        self.n_cores = n_cores
+        self._model = model
+        self._stopwords = list(stopwords) if stopwords else []
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                self.n_cores, initializer=init_worker, initargs=(self._model, self._stopwords)
+            )
+        return self._pool
+
+    def map(self, func, iterable):
+        return self.pool.map(func, iterable)
+
+    def imap(self, func, iterable, chunksize=1):
+        return self.pool.imap(func, iterable, chunksize)
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        return self.pool.imap_unordered(func, iterable, chunksize)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InlinePool:
+    """
+    Runs the tasks given to it in the current process, in order, with the same
+    interface as a `WorkerPool`.
+
+    Used inside a worker to run the stages meant for a `WorkerPool`, see
+    `canosp2020.preprocessing.preprocess_df`.
+    """
+
+    n_cores = 1
+
+    def map(self, func, iterable):
+        return list(map(func, iterable))
+
+    def imap(self, func, iterable, chunksize=1):
+        return map(func, iterable)
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        return map(func, iterable)
@@ -1,16 +1,45 @@
-import json
 import csv
 import argparse
 import pathlib
 import random
 import datetime
-from textpipe import pipeline
+import functools
+import multiprocessing
+import re
+import time
+
+from canosp2020.export import TicketWriter, export_tickets
+from canosp2020.sampler import StratifiedSampler
+
+# Number of texts cleaned by a worker process at once
+CLEAN_TEXT_BATCH_SIZE = 100
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Everything but letters and digits, see `issued_key`
+NON_ALPHANUMERIC_RE = re.compile(r"[\W_]+")
+
+# Number of normalized content characters compared to recognize an issued ticket,
+# the cleaning may change the end of long texts
+ISSUED_CONTENT_KEY_LENGTH = 200
+
+
+@functools.lru_cache(maxsize=None)
+def clean_text_pipeline():
+    """
+    The textpipe cleaning pipeline, built once per process
+
+    textpipe is only imported here, the ticket selection does not need it.
+    """
+    from textpipe import pipeline
+
+    return pipeline.Pipeline(["CleanText"])
 
 
 def preprocess_text(text):
     """
     Clean and process the raw ticket text
-    
+
     text -- string to be preprocessed
     """
     # text = text.replace(",", "")  # remove commas
@@ -18,106 +47,176 @@ def preprocess_text(text):
     text = text.replace("\n", "")  # remove newlines
     text = text.replace("\r", "")  # remove other newlines
 
-    pipe = pipeline.Pipeline(["CleanText"])
+    return clean_text_pipeline()(text)["CleanText"]
 
-    return pipe(text)["CleanText"]
 
-
-def write_ticket(csv_writer, ticket):
+def preprocess_texts(texts):
     """
-    Writes a ticket as a row in the CSV file
+    Clean and process a batch of raw ticket texts
 
-    csv_writer -- csv.writer object
-    ticket -- ticket dictionary
+    texts -- list of strings to be preprocessed
     """
-    ticket_title = preprocess_text(ticket["title"])
-    ticket_content = preprocess_text(ticket["content"])
+    return [preprocess_text(text) for text in texts]
 
-    # CSV writer takes a list as a row
-    # ticket_list = [ticket["ticket_id"], ticket_title, ticket_content]
-    ticket_list = [ticket_title, ticket_content]
 
-    csv_writer.writerow(ticket_list)
+def init_worker():
+    """Builds the cleaning pipeline when a worker process starts"""
+    clean_text_pipeline()
 
 
-def ticket_to_csv(json_path, csv_path, num_tickets, random_seed, date_cutoff_days):
-    """
-    Converts a ticket JSON file into a CSV file, with ticket title and content as columns
-    
-    json_path -- path to the input JSON file
-    csv_path -- path to the output CSV file
-    num_tickets -- # of tickets to include in the output CSV
-    random_seed -- seed for the random number generator
-    date_cutoff_days -- how many days back to set the minimum ticket date
+def clean_texts(texts, n_cores=1, batch_size=CLEAN_TEXT_BATCH_SIZE):
     """
-    random.seed(random_seed)
+    Clean and process raw ticket texts, in batches spread over worker processes
 
-    current_num_tickets = 0
-
-    cutoff_date = datetime.datetime.now() - datetime.timedelta(days=date_cutoff_days)
-    print(f"Cutoff time for random tickets: {cutoff_date.strftime('%b %d %Y %H:%M:%S')}")
-
-    # load JSON file
-    with open(json_path, "r") as json_file:
-        json_dict = json.loads(json_file.read())
+    texts -- list of strings to be preprocessed
+    n_cores -- # of worker processes, the texts are cleaned in this process if 1
+    batch_size -- # of texts sent to a worker at once
+    """
+    if n_cores <= 1 or len(texts) <= batch_size:
+        return preprocess_texts(texts)
 
-    # create set of human tagger IDs
-    human_taggers = set()
-    for tagger in json_dict["taggers"]:
-        if tagger["tagger_id"] != "0":
-            human_taggers.add(tagger["tagger_id"])
-    print("Human Taggers:", human_taggers)
+    batches = [texts[start : start + batch_size] for start in range(0, len(texts), batch_size)]
+    with multiprocessing.Pool(n_cores, initializer=init_worker) as pool:
+        return [text for batch in pool.imap(preprocess_texts, batches) for text in batch]
 
-    tickets = json_dict["tickets"]
-    ticket_ids = set()  # IDs of tickets we want in the output CSV
 
-    # get the IDs of all tickets with >= 2 human annotations
-    for ticket in tickets:
-        ticket_taggers = ticket["tags"].keys()
+def issued_key(title, content):
+    """
+    Normalized ticket title and start of the content, the same before and after cleaning
 
-        # set containing IDs of humans who tagged it
-        human_ticket_taggers = human_taggers & set(ticket_taggers)
+    Titles alone are not enough, many different tickets are titled "Firefox crashes".
 
-        if len(human_ticket_taggers) >= 2:  # >= 2 humans have tagged this ticket
-            if ticket["ticket_id"] not in ticket_ids:
-                ticket_ids.add(ticket["ticket_id"])
-                current_num_tickets += 1
+    title -- raw or cleaned ticket title
+    content -- raw or cleaned ticket content
+    """
+    content_key = NON_ALPHANUMERIC_RE.sub("", content.lower())[:ISSUED_CONTENT_KEY_LENGTH]
+    return NON_ALPHANUMERIC_RE.sub("", title.lower()), content_key
 
-    print(f"{current_num_tickets} tickets with >= 2 human annotations included")
 
-    # fill the rest with random tickets
-    # note that this will loop forever if not enough tickets satisfying the conditions exist
-    while current_num_tickets < num_tickets:
-        ticket = random.choice(tickets)
-        ticket_time = datetime.datetime.utcfromtimestamp(int(ticket["timestamp"]))
+def issued_tickets(csv_paths):
+    """
+    Reads the keys of the tickets issued in earlier MTurk batches
 
-        if ticket["ticket_id"] not in ticket_ids and ticket_time > cutoff_date:
-            ticket_ids.add(ticket["ticket_id"])
-            current_num_tickets += 1
+    csv_paths -- paths to CSV files written by this script
+    """
+    keys = set()
+    for csv_path in csv_paths:
+        with open(csv_path, newline="") as csv_file:
+            for row in csv.DictReader(csv_file):
+                keys.add(issued_key(row["sumo-ticket-title"], row["sumo-ticket-text"]))
+    return keys
 
-    # create CSV writer
-    csv_file = open(csv_path, "w")
-    csv_writer = csv.writer(csv_file, delimiter=",")
 
-    # write the CSV header
-    # csv_columns = ["ticket_id", "sumo-ticket-title", "sumo-ticket-text"]
-    csv_columns = ["sumo-ticket-title", "sumo-ticket-text"]
-    csv_writer.writerow(csv_columns)
+class MTurkWriter(TicketWriter):
+    """
+    Writes a sample of tickets to a CSV file, with ticket title and content as columns
 
-    # write the tickets to the output CSV
-    written_tickets = set()
-    for ticket in tickets:
-        if len(written_tickets) == num_tickets:
-            break
+    Every ticket with >= 2 human annotations is included, the rest is filled
+    with random tickets newer than the cutoff date, stratified by the number
+    of humans who tagged them. The random tickets are drawn with reservoir
+    sampling while the tickets stream by, see `canosp2020.sampler`.
+    Tickets issued in earlier batches are left out.
 
-        if ticket["ticket_id"] in ticket_ids and ticket["ticket_id"] not in written_tickets:
-            # write the ticket as a row in the CSV
-            write_ticket(csv_writer, ticket)
-            written_tickets.add(ticket["ticket_id"])
+    csv_path -- path to the output CSV file
+    num_tickets -- # of tickets to include in the output CSV
+    random_seed -- seed for the random number generator
+    date_cutoff_days -- how many days back to set the minimum ticket date
+    n_cores -- # of worker processes cleaning the text of the selected tickets
+    exclude_paths -- paths to the CSV files of earlier batches
+    """
 
-    csv_file.close()
+    def __init__(self, csv_path, num_tickets, random_seed, date_cutoff_days, n_cores=1, exclude_paths=()):
+        self.csv_path = csv_path
+        self.num_tickets = num_tickets
+        self.n_cores = n_cores
+        self.random = random.Random(random_seed)
+
+        # tickets are compared to the cutoff as epoch seconds, like their timestamps
+        self.cutoff_timestamp = int(time.time()) - date_cutoff_days * SECONDS_PER_DAY
+        cutoff_date = datetime.datetime.utcfromtimestamp(self.cutoff_timestamp)
+        print(f"Cutoff time for random tickets: {cutoff_date.strftime('%b %d %Y %H:%M:%S')} UTC")
+
+        self.excluded = issued_tickets(exclude_paths)
+        if exclude_paths:
+            print(f"Excluding {len(self.excluded)} tickets issued in {', '.join(map(str, exclude_paths))}")
+        self.num_excluded = 0
+
+        self.position = 0  # position of the current ticket in the input
+        self.human_tickets = []  # (position, ticket) of tickets with >= 2 human annotations
+        self.sampler = StratifiedSampler(num_tickets, self.random)  # (position, ticket) of the other recent tickets
+
+    def open(self, taggers):
+        # create set of human tagger IDs
+        self.human_taggers = {tagger["tagger_id"] for tagger in taggers if tagger["tagger_id"] != "0"}
+        print("Human Taggers:", self.human_taggers)
+
+    def write(self, ticket):
+        self.position += 1
+
+        # number of humans who tagged it
+        num_human_taggers = len(self.human_taggers.intersection(ticket["tags"]))
+        if num_human_taggers < 2 and int(ticket["timestamp"]) <= self.cutoff_timestamp:
+            return
+
+        if self.excluded and issued_key(ticket["title"], ticket["content"]) in self.excluded:
+            self.num_excluded += 1
+            return
+
+        if num_human_taggers >= 2:  # >= 2 humans have tagged this ticket
+            self.human_tickets.append((self.position, ticket))
+        else:
+            self.sampler.add(num_human_taggers, (self.position, ticket))
+
+    def close(self):
+        print(f"{len(self.human_tickets)} tickets with >= 2 human annotations included")
+        if self.num_excluded:
+            print(f"{self.num_excluded} tickets left out, issued in earlier batches")
+
+        # fill the rest with random tickets, as many from every stratum as its share of the candidates
+        selected = self.human_tickets[: self.num_tickets]
+        num_random = self.num_tickets - len(selected)
+        for stratum, count in sorted(self.sampler.allocation(num_random).items()):
+            print(f"{count} random tickets out of {self.sampler.sizes[stratum]} with {stratum} human annotations")
+        selected += self.sampler.sample(num_random)
+        if len(selected) < self.num_tickets:
+            print(f"Warning: only {len(selected)} tickets satisfy the conditions, {self.num_tickets} were requested")
+
+        # clean the titles and contents of all the selected tickets at once, in input order
+        selected = [ticket for _, ticket in sorted(selected, key=lambda item: item[0])]
+        texts = clean_texts(
+            [text for ticket in selected for text in (ticket["title"], ticket["content"])], self.n_cores
+        )
+
+        # create CSV writer
+        with open(self.csv_path, "w") as csv_file:
+            csv_writer = csv.writer(csv_file, delimiter=",")
+
+            # write the CSV header
+            # csv_columns = ["ticket_id", "sumo-ticket-title", "sumo-ticket-text"]
+            csv_columns = ["sumo-ticket-title", "sumo-ticket-text"]
+            csv_writer.writerow(csv_columns)
+
+            # write the tickets to the output CSV, a title and a content per row
+            csv_writer.writerows(zip(texts[0::2], texts[1::2]))
+
+        return f"Wrote {len(selected)} unique tickets to {self.csv_path}"
+
+
+def ticket_to_csv(json_path, csv_path, num_tickets, random_seed, date_cutoff_days, n_cores=1, exclude_paths=()):
+    """
+    Converts a ticket JSON file into a CSV file, with ticket title and content as columns,
+    see export_tickets.py to write several formats at once
 
-    print(f"Wrote {len(written_tickets)} unique tickets to {csv_path}")
+    json_path -- path to the input JSON file or .db ticket store
+    csv_path -- path to the output CSV file
+    num_tickets -- # of tickets to include in the output CSV
+    random_seed -- seed for the random number generator
+    date_cutoff_days -- how many days back to set the minimum ticket date
+    n_cores -- # of worker processes cleaning the ticket text
+    exclude_paths -- paths to the CSV files of earlier batches, their tickets are left out
+    """
+    writer = MTurkWriter(csv_path, num_tickets, random_seed, date_cutoff_days, n_cores, exclude_paths)
+    export_tickets(json_path, [writer])
 
 
 # this runs when you directly run the file (not when imported)
@@ -125,7 +224,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Convert a ticket JSON file to CSV format, with ticket title and content as columns"
     )
-    parser.add_argument("--json_file", help="the relative path to the input JSON file", required=True)
+    parser.add_argument(
+        "--json_file", help="the relative path to the input JSON file or .db ticket store", required=True
+    )
     parser.add_argument("--csv_file", help="the relative path to the output CSV file", required=True)
     parser.add_argument(
         "--random_seed",
@@ -148,6 +249,20 @@ if __name__ == "__main__":
         default=540,
         type=int,
     )
+    parser.add_argument(
+        "--n_cores",
+        help="(optional) the number of worker processes cleaning the ticket text (integer)",
+        required=False,
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        "--exclude_csv",
+        help="(optional) CSV files of earlier batches, e.g. data/mturk_tickets.csv, their tickets are left out",
+        required=False,
+        nargs="*",
+        default=[],
+    )
 
     args = parser.parse_args()
 
@@ -174,4 +289,12 @@ if __name__ == "__main__":
                 exit(0)
 
     # convert JSON to CSV
-    ticket_to_csv(json_path, csv_path, args.num_tickets, args.random_seed, args.date_cutoff_days)
+    ticket_to_csv(
+        json_path,
+        csv_path,
+        args.num_tickets,
+        args.random_seed,
+        args.date_cutoff_days,
+        args.n_cores,
+        args.exclude_csv,
+    )
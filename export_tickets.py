@@ -0,0 +1,119 @@
+import argparse
+import pathlib
+
+from canosp2020.export import export_tickets
+from json_to_crowdtruth_csv import CrowdTruthWriter
+from ticket_to_csv import ticket_writer
+
+
+def confirm_overwrite(csv_path):
+    """
+    If the output file already exists, ask the user whether they want to overwrite it
+
+    csv_path -- path to an output file
+    """
+    if csv_path.exists():
+        while True:
+            choice = input(f"Warning: {csv_path} already exists. Overwrite? (y/n): ").lower()
+            if choice == "y":
+                break
+            elif choice == "n":
+                print("Exiting")
+                exit(0)
+
+
+# this runs when you directly run the file (not when imported)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a ticket JSON file to any of the CSV formats, reading the tickets only once"
+    )
+    parser.add_argument(
+        "--json_file", help="the relative path to the input JSON file or .db ticket store", required=True
+    )
+    parser.add_argument(
+        "--csv_file",
+        help="(optional) the output CSV file, with a column per tagger, .csv.gz, .csv.zst or .parquet also work",
+    )
+    parser.add_argument("--crowdtruth_file", help="(optional) the output CSV file of CrowdTruth judgments")
+    parser.add_argument(
+        "--crowdtruth_append",
+        help="(optional) append only the new annotations to an existing CrowdTruth CSV file",
+        action="store_true",
+    )
+    parser.add_argument("--mturk_file", help="(optional) the output CSV file of tickets to tag on MTurk")
+    parser.add_argument(
+        "--random_seed",
+        help="(optional) the seed for the MTurk sample (integer)",
+        required=False,
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--num_tickets",
+        help="(optional) the number of tickets in the MTurk sample (integer)",
+        required=False,
+        default=2000,
+        type=int,
+    )
+    parser.add_argument(
+        "--date_cutoff_days",
+        help="(optional) the number of days back from the current date to sample MTurk tickets from (integer)",
+        required=False,
+        default=540,
+        type=int,
+    )
+    parser.add_argument(
+        "--n_cores",
+        help="(optional) the number of worker processes cleaning the MTurk ticket text (integer)",
+        required=False,
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        "--exclude_csv",
+        help="(optional) CSV files of earlier MTurk batches, e.g. data/mturk_tickets.csv, their tickets are left out",
+        required=False,
+        nargs="*",
+        default=[],
+    )
+
+    args = parser.parse_args()
+
+    path = pathlib.Path()
+    json_path = path / args.json_file
+    print("json_path: ", json_path.absolute())
+
+    # exit if the JSON file doesn't exist
+    if not json_path.exists():
+        print("Error: that json file does not exist")
+        exit(1)
+
+    writers = []
+    if args.csv_file:
+        confirm_overwrite(path / args.csv_file)
+        writers.append(ticket_writer(path / args.csv_file))
+    if args.crowdtruth_file:
+        if not args.crowdtruth_append:
+            confirm_overwrite(path / args.crowdtruth_file)
+        writers.append(CrowdTruthWriter(path / args.crowdtruth_file, args.crowdtruth_append))
+    if args.mturk_file:
+        # the MTurk text cleaning needs textpipe, only import it when needed
+        from create_mturk_csv import MTurkWriter
+
+        confirm_overwrite(path / args.mturk_file)
+        writers.append(
+            MTurkWriter(
+                path / args.mturk_file,
+                args.num_tickets,
+                args.random_seed,
+                args.date_cutoff_days,
+                args.n_cores,
+                [path / exclude_csv for exclude_csv in args.exclude_csv],
+            )
+        )
+
+    if not writers:
+        print("Error: no output file, use --csv_file, --crowdtruth_file and/or --mturk_file")
+        exit(1)
+
+    export_tickets(json_path, writers)
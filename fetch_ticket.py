@@ -1,21 +1,47 @@
+import calendar
 import json
 import pytz
 import math
-import requests
 import logging
 import os
-import dateutil.parser as dp
 import click
 import csv
 import errno
+import itertools
+import numpy as np
+import pandas as pd
 
-from datetime import datetime
-from typing import Dict, List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
 
 from urllib.parse import urljoin
 
+from canosp2020.archive import TicketArchive
+from canosp2020.external_sort import external_sort, unique_by
+from canosp2020.fetcher import FetchError, PageFetcher
+from canosp2020.json_stream import iter_items, iter_members
+from canosp2020.store import SQLITE_BATCH_SIZE, TicketStore
+
 SUMO_API_ROOT = "https://support.mozilla.org/api/2/"
 
+SUMO_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+PACIFIC = pytz.timezone("US/Pacific")
+EPOCH = pd.Timestamp(0, tz="UTC")
+
+SUMO_QUESTIONS_QUERY = {
+    "format": "json",
+    "product": "firefox",
+    "locale": "en-US",
+    "ordering": "-created",
+}
+
+# Newest ticket already archived, see `read_watermark`
+WATERMARK_FILE = ".watermark"
+
+# Tickets created this long before the watermark are requested again, in case the
+# watermark and the API disagree on time zones, tickets already archived are filtered by id
+SYNC_OVERLAP = timedelta(hours=1)
+
 
 logging.info("start logging")
 logger = logging.getLogger("fetch_ticket")
@@ -37,20 +63,27 @@ def safe_open_w(path, mode="wt"):
     return open(path, mode)
 
 
-def archive_page(data, page, dir="./raw_data/"):
-    with open(os.path.join(dir, f"tickets_{page}.json"), "w") as f:
-        json.dump(data, f)
+def archive_page(data, page, dir="./raw_data/", store: TicketStore = None):
+    """
+    Append the tickets of a page to the archive in `dir`, see `canosp2020.archive`,
+    and upsert them in `store` if given.
+    """
+    TicketArchive(dir).append(data)
+    if store is not None:
+        store.upsert_tickets(data)
+    logger.info(f"archived page {page}: {len(data)} tickets")
 
 
 def transform_results(data):
     tickets = []
-    for raw_ticket in data["results"]:
+    timestamps = convert_pst_to_utc_many([raw_ticket["created"] for raw_ticket in data["results"]])
+    for raw_ticket, timestamp in zip(data["results"], timestamps):
         tickets.append(
             {
                 "ticket_id": raw_ticket["id"],
                 "title": raw_ticket["title"],
                 "content": raw_ticket["content"],
-                "timestamp": convert_pst_to_utc(raw_ticket["created"]),
+                "timestamp": timestamp,
                 "tags": {
                     # sumo tags
                     "0": [each["slug"] for each in raw_ticket["tags"]]
@@ -61,90 +94,222 @@ def transform_results(data):
 
 
 # https://github.com/mozilla-it/sumo/blob/master/Kitsune/get_kitsune_data.py
-def convert_pst_to_utc(dt_str):
-    fmt = "%Y-%m-%dT%H:%M:%SZ"
-    pacific = pytz.timezone("US/Pacific")
-    loc_dt = pacific.localize(datetime.strptime(dt_str, fmt))
-    dt_utc = loc_dt.astimezone(pytz.utc)
-    return dp.parse(dt_utc.strftime(fmt)).strftime("%s")
+def convert_pst_to_utc(dt_str) -> int:
+    """
+    Convert a SUMO `created` time, in Pacific time despite the Z suffix, to epoch seconds.
 
+    Ambiguous times are read as standard time and nonexistent times are
+    shifted forward by an hour, like `pytz` localize does by default.
+    """
+    loc_dt = PACIFIC.localize(datetime.strptime(dt_str, SUMO_TIME_FORMAT))
+    return calendar.timegm(loc_dt.utctimetuple())
 
-def get_question_data(api_url_base, params):
+
+def convert_pst_to_utc_many(dt_strs: List[str]) -> List[int]:
+    """
+    Vectorized `convert_pst_to_utc`, converts every time in a single pass.
+    """
+    if not dt_strs:
+        return []
+    created = pd.to_datetime(pd.Series(dt_strs), format=SUMO_TIME_FORMAT)
+    localized = created.dt.tz_localize(
+        "US/Pacific", ambiguous=np.zeros(len(created), dtype=bool), nonexistent=pd.Timedelta(hours=1)
+    )
+    return ((localized - EPOCH) // pd.Timedelta(seconds=1)).tolist()
+
+
+def read_watermark(dir="./raw_data/") -> Optional[Dict]:
+    """
+    Read the newest ticket id and timestamp already archived in `dir`.
+
+    Without a watermark file, the watermark is computed from the archived pages.
+    A fetch whose pages failed leaves a null watermark when no ticket is known to be
+    archived without gaps, the next sync then fetches everything again.
+    """
+    path = os.path.join(dir, WATERMARK_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    if not os.path.isdir(dir):
+        return None
+    tickets = iter_pages(dir)
+    first = next(tickets, None)
+    if first is None:
+        return None
+    return newest_ticket(itertools.chain([first], tickets))
+
+
+def newest_ticket(tickets) -> Dict:
+    newest = max(tickets, key=lambda ticket: int(ticket["ticket_id"]))
+    return {"ticket_id": int(newest["ticket_id"]), "timestamp": int(newest["timestamp"])}
+
+
+def write_watermark(tickets, dir="./raw_data/"):
+    """
+    Move the watermark of `dir` forward to the newest of `tickets`.
+    """
+    watermark = newest_ticket(tickets)
+    path = os.path.join(dir, WATERMARK_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if previous is not None and previous["ticket_id"] >= watermark["ticket_id"]:
+            return
+    save_watermark(watermark, dir)
+
+
+def save_watermark(watermark: Optional[Dict], dir="./raw_data/"):
+    """
+    Replace the watermark of `dir`, even by an older one, None means nothing is known to be archived.
+    """
+    mkdir_p(dir)
+    with open(os.path.join(dir, WATERMARK_FILE), "w") as f:
+        json.dump(watermark, f)
+
+
+def get_question_data(api_url_base, params, concurrency=8, rate=5.0, store=None):
     api_url = f"{api_url_base}?_method=GET"
 
     results = []
-    response = requests.get(api_url, params=params)
+    fetcher = PageFetcher(api_url, params, concurrency=concurrency, rate=rate)
 
-    if response.status_code == 200:
-        raw = response.json()
-        archive_page(transform_results(raw), 1)
+    try:
+        raw = fetcher.fetch_page(1)
+    except FetchError as e:
+        print(f"[!] {e} calling [{api_url}]")  # 401 unauthorized
+        return None
+    newest = transform_results(raw)
+    archive_page(newest, 1, store=store)
 
-        print(f"total count: {raw['count']}")
-        total_pages = math.ceil(raw["count"] / 20.0)
-        print(f"total pages: {total_pages}")
+    print(f"total count: {raw['count']}")
+    total_pages = math.ceil(raw["count"] / 20.0)
+    print(f"total pages: {total_pages}")
 
-        # while raw['next'] is not None:
-        for page in range(2, total_pages):
-            params["page"] = str(page)
-            print(page)
-            response = requests.get(api_url, params=params)
+    # newest ticket of every page, to know which tickets are archived without gaps if pages fail
+    page_watermarks = {}
+    for page, raw in fetcher.fetch_pages(range(2, total_pages + 1)):
+        print(page)
+        tickets = transform_results(raw)
+        archive_page(tickets, page, store=store)
+        if tickets:
+            page_watermarks[page] = newest_ticket(tickets)
 
-            if response.status_code == 200:
-                raw = response.json()
-                archive_page(transform_results(raw), page)
-            else:
-                print("[!] HTTP {0} calling [{1}]".format(response.status_code, raw["next"]))  # 401 unauthorized
+    print(fetcher.report())
+    fetcher.close()
+    if fetcher.failed:
+        # pages are ordered newest first: only the pages older than every failed page are
+        # complete, the watermark goes back there so the next sync fetches the missing tickets
+        complete = [watermark for page, watermark in page_watermarks.items() if page > max(fetcher.failed)]
+        save_watermark(max(complete, key=lambda watermark: watermark["ticket_id"]) if complete else None)
+    elif newest:
+        write_watermark(newest)
 
-        logger.info("returning results")
-        return results
+    logger.info("returning results")
+    return results
 
-    else:
-        print("[!] HTTP {0} calling [{1}]".format(response.status_code, api_url))  # 401 unauthorized
-        return None
 
+def fetch_sumo_tagged(store=None, concurrency=8, rate=5.0):
+    query_string = {**SUMO_QUESTIONS_QUERY, "created__gt": "2020-01-16 00:00:00"}
+
+    results = get_question_data(
+        "https://support.mozilla.org/api/2/question", query_string, concurrency=concurrency, rate=rate, store=store
+    )
 
-def fetch_sumo_tagged():
-    query_string = {
-        "format": "json",
-        "product": "firefox",
-        "locale": "en-US",
-        "ordering": "-created",
-        "created__gt": "2020-01-16 00:00:00",
-    }
 
-    results = get_question_data("https://support.mozilla.org/api/2/question", query_string)
+def sync_sumo_tagged(dir="./raw_data/", store=None, concurrency=8, rate=5.0):
+    """
+    Only fetch the tickets created since the last fetch or sync.
 
+    Pages are requested from the newest ticket on, paging stops at the first
+    ticket already archived, and only the new tickets are appended to the archive.
+    `concurrency` only matters when nothing is archived yet and everything is fetched.
+    """
+    watermark = read_watermark(dir)
+    if watermark is None:
+        print("No tickets archived yet, fetching everything")
+        return fetch_sumo_tagged(store, concurrency, rate)
+
+    since = datetime.fromtimestamp(watermark["timestamp"], tz=timezone.utc) - SYNC_OVERLAP
+    since = since.astimezone(PACIFIC).strftime("%Y-%m-%d %H:%M:%S")
+    query_string = {**SUMO_QUESTIONS_QUERY, "created__gt": since}
+    fetcher = PageFetcher(
+        "https://support.mozilla.org/api/2/question?_method=GET", query_string, concurrency=concurrency, rate=rate
+    )
+
+    delta = []
+    complete = True
+    page = 1
+    while True:
+        try:
+            raw = fetcher.fetch_page(page)
+        except FetchError as e:
+            # keep the watermark so the next sync fetches the missing pages again
+            print(f"[!] {e}")
+            complete = False
+            break
+        tickets = transform_results(raw)
+        new_tickets = [ticket for ticket in tickets if int(ticket["ticket_id"]) > watermark["ticket_id"]]
+        delta.extend(new_tickets)
+        # tickets are ordered newest first, the next pages are already archived
+        if len(new_tickets) < len(tickets) or not raw.get("next"):
+            break
+        page += 1
+    fetcher.close()
+
+    if delta:
+        archive_page(delta, f"sync_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}", dir, store)
+        if complete:
+            write_watermark(delta, dir)
+        else:
+            # the new tickets must not move a watermark computed from the archived pages either
+            save_watermark(watermark, dir)
+    print(f"{len(delta)} new tickets since ticket {watermark['ticket_id']}")
 
-def get_pages(dir="raw_data") -> List[Dict]:
+
+def iter_pages(dir="raw_data") -> Iterator[Dict]:
+    """
+    Stream the tickets of `dir`: the legacy JSON files first, then the archive.
+    """
     if not os.path.isdir(dir):
         raise Exception('Directory "{}" does not exist.'.format(dir))
 
-    (dirpath, _, filenames) = next(os.walk(dir))
+    dirpath, _, filenames = next(os.walk(dir))
     filenames = sorted([filename for filename in filenames if filename.endswith(".json")])
 
     # for future reference, my raw_data directory looks like this:
     #
     # raw_data
-    # -- tickets.json       - the previous master JSON
-    # -- tickes_1.json      - output of pythonfetch_ticket.py fetch
-    # -- ...                - output of pythonfetch_ticket.py fetch
-    # -- tickets_70.json    - output of pythonfetch_ticket.py fetch
-
-    tickets = []
+    # -- tickets.json            - the previous master JSON
+    # -- tickes_1.json           - output of pythonfetch_ticket.py fetch, before the archive
+    # -- ...                     - output of pythonfetch_ticket.py fetch, before the archive
+    # -- tickets_70.json         - output of pythonfetch_ticket.py fetch, before the archive
+    # -- tickets-000001.jsonl.gz - archive segments, see canosp2020.archive
+    # -- index.tsv               - archive index
+
+    # the files are streamed, only one ticket is held in memory at a time
     for filename in filenames:
+        path = os.path.join(dirpath, filename)
         if filename == "tickets.json":
-            with open(os.path.join(dirpath, filename)) as input_f:
-                tickets.extend(json.loads(input_f.read())["tickets"])
+            yield from (value for key, value in iter_members(path, "tickets") if key == "tickets")
         else:
-            with open(os.path.join(dirpath, filename)) as input_f:
-                tickets.extend(json.load(input_f))
+            yield from iter_items(path)
+
+    yield from TicketArchive(dir).iter_tickets()
+
+
+def get_pages(dir="raw_data") -> List[Dict]:
+    return list(iter_pages(dir))
 
-    return tickets
 
+def ticket_key(ticket):
+    return int(ticket["ticket_id"])
 
-def merge_tickets():
+
+def merge_tickets(store=None):
     """
     Merge tickets by pages and put crowdsource tags in as well.
+
+    The merged tickets are written to `data/tickets.json`, and upserted in `store` if given.
     """
     # read all taggers info
     taggers = {}
@@ -171,68 +336,81 @@ def merge_tickets():
                     "tags": {row[2]: row[1].split(";") if row[1] else []},
                 }
 
-    # read all tickets from raw_data folder
-    tickets = get_pages()
-    output_tickets = []
+    # stream all tickets from raw_data folder sorted by ticket_id, the sort is stable so the
+    # copies of a ticket stay in archive order, and the last one, from the latest fetch, wins
+    tickets = unique_by(external_sort(iter_pages(), key=ticket_key), key=ticket_key, keep="last")
 
-    ticket_ids = set()
-
-    # count the # of human-annotated tickets
+    # count the # of total and human-annotated tickets
+    total = 0
     human_tagged = 0
 
-    for each in tickets:
-        ticket_id = each["ticket_id"]
-
-        # avoid duplicates
-        if ticket_id in ticket_ids:
-            continue
-        ticket_ids.add(ticket_id)
-
-        if crowdsouce_tickets.get(str(ticket_id), None):
-            human_tagged += 1
-            sumo_tags = each["tags"]
-            crowdsource_tags = crowdsouce_tickets[str(ticket_id)]["tags"]
-            output_tickets.append(
-                {
+    if store is not None:
+        store.upsert_taggers(taggers.values())
+    batch = []
+
+    output_path = "data/tickets.json"
+    now = datetime.utcnow().strftime("%s")
+    with safe_open_w(output_path + ".tmp") as f:
+        # taggers are written before the tickets, so readers can stream the tickets
+        f.write(
+            f'{{"created_timestamp": {json.dumps(now)}, "last_updated_timestamp": {json.dumps(now)}, '
+            f'"taggers": {json.dumps(list(taggers.values()))}, "tickets": ['
+        )
+        for each in tickets:
+            ticket_id = each["ticket_id"]
+
+            if crowdsouce_tickets.get(str(ticket_id), None):
+                human_tagged += 1
+                sumo_tags = each["tags"]
+                crowdsource_tags = crowdsouce_tickets[str(ticket_id)]["tags"]
+                each = {
                     "ticket_id": str(each["ticket_id"]),
                     "title": each["title"],
                     "content": each["content"],
                     "timestamp": each["timestamp"],
                     "tags": {**sumo_tags, **crowdsource_tags},
                 }
-            )
-        else:
-            output_tickets.append(each)
 
-    # sort output json by ticket_id
-    output_tickets.sort(key=lambda x: int(x["ticket_id"]))
+            f.write((", " if total else "") + json.dumps(each))
+            total += 1
 
-    # some stats
-    print(f"{len(output_tickets)} total tickets. {human_tagged} human annotated.")
+            if store is not None:
+                batch.append(each)
+                if len(batch) == SQLITE_BATCH_SIZE:
+                    store.upsert_tickets(batch)
+                    batch = []
+        f.write("]}")
+    if batch:
+        store.upsert_tickets(batch)
+    os.replace(output_path + ".tmp", output_path)
 
-    with safe_open_w("data/tickets.json") as f:
-        json.dump(
-            {
-                "created_timestamp": datetime.utcnow().strftime("%s"),
-                "last_updated_timestamp": datetime.utcnow().strftime("%s"),
-                "tickets": output_tickets,
-                "taggers": list(taggers.values()),
-            },
-            f,
-        )
+    # some stats
+    print(f"{total} total tickets. {human_tagged} human annotated.")
 
 
 @click.command()
 @click.argument("command", required=True)
-def main(command):
+@click.option("--db", default=None, help="Also upsert the tickets in this SQLite store, e.g. data/tickets.db")
+@click.option("--concurrency", default=8, show_default=True, help="Maximum number of API requests in flight")
+@click.option("--rate", default=5.0, show_default=True, help="Maximum number of API requests per second")
+def main(command, db, concurrency, rate):
     """
-    fetch_ticket.py [fetch|merge]
+    fetch_ticket.py [fetch|sync|merge]
     """
+    store = TicketStore(db) if db else None
+
     if command == "fetch":
-        tickets = fetch_sumo_tagged()
+        tickets = fetch_sumo_tagged(store, concurrency, rate)
+
+    if command == "sync":
+        sync_sumo_tagged(store=store, concurrency=concurrency, rate=rate)
 
     if command == "merge":
-        merge_tickets()
+        merge_tickets(store)
+
+    if store is not None:
+        print(f"{len(store)} tickets in {db}")
+        store.close()
 
 
 if __name__ == "__main__":
@@ -1,21 +1,24 @@
-import json
 import csv
 import argparse
 import pathlib
 
+from canosp2020.export import TicketWriter, export_tickets
 
-class Counter:
-    """Keeps statistics about the tickets and annotations"""
+# Annotations already written to a CSV file, see `CrowdTruthWriter`
+ANNOTATION_INDEX_SUFFIX = ".index.tsv"
+
+CSV_COLUMNS = ["_unit_id", "_created_at", "_id", "_started_at", "_worker_id", "keywords"]
 
-    judgment_id = 0
 
-    ticket_ids = set()
-    total_tickets = 0
-    unique_tickets = 0
+class Counter:
+    """Keeps statistics about the annotations of an export"""
 
-    annotation_ids = set()
-    total_annotations = 0
-    unique_annotations = 0
+    def __init__(self, judgment_id=0, annotation_ids=None):
+        self.judgment_id = judgment_id
+
+        self.annotation_ids = annotation_ids if annotation_ids is not None else {}
+        self.total_annotations = 0
+        self.unique_annotations = 0
 
 
 def preprocess_text(text):
@@ -49,78 +52,126 @@ def write_annotations(csv_writer, ticket, taggers, counter):
         counter.total_annotations += 1
         if annotation_id in counter.annotation_ids:
             continue
-        counter.annotation_ids.add(annotation_id)
+        counter.annotation_ids[annotation_id] = counter.judgment_id
         counter.unique_annotations += 1
 
         # non-SUMO tagger --> write to CSV
         annotation_list = list(ticket_list) + [counter.judgment_id]
         counter.judgment_id += 1
-        tags = "["
-        for tag in tag_dict[tagger]:
-            tags += f'"{preprocess_text(tag)}",'
-        tags = tags[: len(tags) - 1]
-        tags += "]"
+        tags = "[" + ",".join(f'"{preprocess_text(tag)}"' for tag in tag_dict[tagger]) + "]"
 
         annotation_list.append("1/1/2020 00:00:00")
         annotation_list.append(tagger)
         annotation_list.append(tags)
 
-        if len(tags) > 0:
-            csv_writer.writerow(annotation_list)
+        csv_writer.writerow(annotation_list)
 
 
-def ticket_to_csv(json_path, csv_path):
-    """Converts a ticket JSON file into a CSV file"""
+def read_annotation_index(csv_path):
+    """
+    Reads the annotations already written to a CrowdTruth CSV file
 
-    num_tickets = 0
-    num_unique_tickets = 0
+    The index file next to the CSV file is read, or rebuilt from the CSV file if it is missing.
+    Returns a dictionary mapping "ticket_id;tagger_id" to the judgment id.
 
-    # load JSON file
-    with open(json_path, "r") as json_file:
-        json_dict = json.loads(json_file.read())
+    csv_path -- path to a CSV file written by `CrowdTruthWriter`
+    """
+    index_path = pathlib.Path(f"{csv_path}{ANNOTATION_INDEX_SUFFIX}")
+    annotation_ids = {}
+    if index_path.exists():
+        with open(index_path) as index_file:
+            for line in index_file:
+                annotation_id, judgment_id = line.rstrip("\n").split("\t")
+                annotation_ids[annotation_id] = int(judgment_id)
+    elif pathlib.Path(csv_path).exists():
+        with open(csv_path, newline="") as csv_file:
+            for row in csv.DictReader(csv_file):
+                annotation_ids[f"{row['_unit_id']};{row['_worker_id']}"] = int(row["_id"])
+    return annotation_ids
 
-    taggers = []
-    for tagger in json_dict["taggers"]:
-        taggers.append(tagger["tagger_id"])
-    print("Taggers:", taggers)
 
-    # create CSV writer
-    csv_file = open(csv_path, "w", newline="")
-    csv_writer = csv.writer(csv_file, delimiter=",")
+class CrowdTruthWriter(TicketWriter):
+    """
+    Writes the human annotations of tickets as CrowdTruth judgments
 
-    # write the CSV header
-    # ticket_id end_time judgement_id start_time tagger_id tags
-    csv_columns = ["_unit_id", "_created_at", "_id", "_started_at", "_worker_id", "keywords"]
-    csv_writer.writerow(csv_columns)
+    Every annotation written is recorded in an index file next to the CSV
+    file, so later exports can append only the new annotations, numbering
+    them after the ones already written.
 
-    counter = Counter()
+    csv_path -- path to the output CSV file
+    append -- append the new annotations to an existing CSV file instead of overwriting it
+    """
 
-    for ticket in json_dict["tickets"]:
-        # check for duplicates, update statistics
-        counter.total_tickets += 1
-        if ticket["ticket_id"] in counter.ticket_ids:
-            continue
-        counter.ticket_ids.add(ticket["ticket_id"])
-        counter.unique_tickets += 1
+    def __init__(self, csv_path, append=False):
+        self.csv_path = csv_path
+        self.index_path = pathlib.Path(f"{csv_path}{ANNOTATION_INDEX_SUFFIX}")
+        self.append = append and pathlib.Path(csv_path).exists()
 
-        write_annotations(csv_writer, ticket, taggers, counter)
+        if self.append:
+            annotation_ids = read_annotation_index(csv_path)
+            # an index rebuilt from the CSV file is written again as a whole
+            self.num_exported = len(annotation_ids) if self.index_path.exists() else 0
+            self.counter = Counter(max(annotation_ids.values(), default=-1) + 1, annotation_ids)
+        else:
+            self.num_exported = 0
+            self.counter = Counter()
 
-    csv_file.close()
+    def open(self, taggers):
+        self.taggers = [tagger["tagger_id"] for tagger in taggers]
+        print("Taggers:", self.taggers)
 
-    print(f"Finished writing annotations to {csv_path}")
-    print(f"{counter.unique_tickets} tickets ({counter.total_tickets - counter.unique_tickets} duplicates)")
-    print(
-        f"{counter.unique_annotations} annotations ({counter.total_annotations - counter.unique_annotations} duplicates)"
-    )
+        # create CSV writer
+        self.csv_file = open(self.csv_path, "a" if self.append else "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file, delimiter=",")
+
+        # write the CSV header
+        # ticket_id end_time judgement_id start_time tagger_id tags
+        if not self.append:
+            self.csv_writer.writerow(CSV_COLUMNS)
+
+    def write(self, ticket):
+        write_annotations(self.csv_writer, ticket, self.taggers, self.counter)
+
+    def close(self):
+        self.csv_file.close()
+
+        # the index is written after the CSV file, so it never lists annotations missing from it
+        new_annotations = list(self.counter.annotation_ids.items())[self.num_exported :]
+        with open(self.index_path, "a" if self.num_exported else "w") as index_file:
+            index_file.writelines(f"{annotation_id}\t{judgment_id}\n" for annotation_id, judgment_id in new_annotations)
+
+        counter = self.counter
+        return (
+            f"Finished writing annotations to {self.csv_path}: {counter.unique_annotations} new annotations "
+            f"({counter.total_annotations - counter.unique_annotations} already written or duplicates)"
+        )
+
+
+def ticket_to_csv(json_path, csv_path, append=False):
+    """
+    Converts a ticket JSON file into a CSV file, see export_tickets.py to write several formats at once
+
+    json_path -- path to the input JSON file or .db ticket store
+    csv_path -- path to the output CSV file
+    append -- only append the annotations missing from an existing CSV file
+    """
+    export_tickets(json_path, [CrowdTruthWriter(csv_path, append)])
 
 
 # this runs when you directly run the file (not when imported)
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert a ticket JSON file to a CSV format that CrowdTruth can read")
-    parser.add_argument("--json_file", help="the relative path to the input JSON file", required=True)
+    parser.add_argument(
+        "--json_file", help="the relative path to the input JSON file or .db ticket store", required=True
+    )
     parser.add_argument(
         "--csv_file", help="the relative path to the output CSV file (will be overwritten if exists)", required=True
     )
+    parser.add_argument(
+        "--append",
+        help="append only the new annotations to an existing CSV file, numbered after the ones already there",
+        action="store_true",
+    )
 
     args = parser.parse_args()
 
@@ -137,7 +188,7 @@ if __name__ == "__main__":
         exit(1)
 
     # if the CSV file already exists, ask the user whether they want to overwrite it
-    if csv_path.exists():
+    if csv_path.exists() and not args.append:
         while True:
             choice = input("Warning: that CSV file already exists. Overwrite? (y/n): ").lower()
             if choice == "y":
@@ -147,4 +198,4 @@ if __name__ == "__main__":
                 exit(0)
 
     # convert JSON to CSV
-    ticket_to_csv(json_path, csv_path)
+    ticket_to_csv(json_path, csv_path, args.append)
@@ -5,79 +5,59 @@ The output file is located at data/tickets_preprocessed.csv
 
 The input file is the raw ticket data generated by the ticket_to_csv.py.
 
-In this script, we would preprocess the raw ticket parallely by forking multiple copy of the program
-to speed up the processing time.
+In this script, we preprocess the raw tickets in parallel on a pool of worker processes.
+Every worker loads spaCy once and runs the whole pipeline on the chunks it receives,
+chunks are sent to the workers and back as Arrow IPC streams.
+
+Use --work_dir to checkpoint every chunk, running the same command again after a crash resumes the job.
+
+Use --compare to also run `Preprocess.preprocess_tickets` on the same input and compare the throughput.
 """
 
 import os
-import json
-import csv
 import argparse
 import multiprocessing
-import subprocess
 import pathlib
 
 import pandas as pd
-import numpy as np
-from canosp2020.preprocessing import Preprocess
-
-
-SCRIPT_NAME = "parallel_preprocess_tickets.py"
-
-
-def preprocess_df(df):
-    preprocessor = Preprocess()
-    df["title"] = df["title"].map(lambda x: preprocessor.preprocess(x))
-    df["content"] = df["content"].map(lambda x: preprocessor.preprocess(x))
-    return df
-
-
-def worker(input_file):
-    return subprocess.call(["python", SCRIPT_NAME, "--input_file", input_file, "--output_file", input_file])
-
-
-def parallel_preprocess(input_files, num_cores):
-    # # Run preprocessing of csv in parallel using subprocess
-    pool = multiprocessing.Pool(num_cores)
-    pool.map(worker, input_files)
-    pool.close()
-    pool.join()
+from canosp2020.engine import preprocess_parallel, preprocess_resumable
+from canosp2020.instrumentation import Instrumentation, JSONLinesWriter, print_stage
+from canosp2020.jobs import PreprocessJob
+from canosp2020.preprocessing import PIPELINE_VERSION, Preprocess
+from canosp2020.worker_pool import SPACY_MODEL, WorkerPool
 
 
-def preprocess_file(input_path, output_path):
-    input_df = pd.read_csv(input_path)
-    output_df = preprocess_df(input_df)
-    output_df.to_csv(output_path, index=False)
-
-
-def split(input_path):
-    num_cores = multiprocessing.cpu_count()
-
+def default_output_path(input_path):
     input_filename, input_file_ext = os.path.splitext(os.path.basename(input_path))
     input_dir, _ = os.path.split(input_path)
-    output_filename = f"{input_filename}_preprocessed{input_file_ext}"
-    output_path = os.path.join(input_dir, output_filename)
-
-    # Split files into N chunck
-    input_df = pd.read_csv(input_path)
-    df_split = np.array_split(input_df, num_cores)
+    return os.path.join(input_dir, f"{input_filename}_preprocessed{input_file_ext}")
 
-    if not os.path.exists(".tmp"):
-        os.mkdir(".tmp")
 
-    filenames = [f".tmp/{input_filename}.{i}{input_file_ext}" for i in range(len(df_split))]
-    for name, df in zip(filenames, df_split):
-        df.to_csv(name, index=False)
+def preprocess_file(input_path, output_path, n_cores, num_2_word=False, instrumentation=None, work_dir=None):
+    instrumentation = instrumentation or Instrumentation()
+    df = Preprocess._read_df(pd.read_csv(input_path))
 
-    # Since spacy and numpy are not optimized for multiprocessing
-    # We will use subprocess to fork multiple copy of program
-    # to preprocess each chunk of input files
-    parallel_preprocess(filenames, num_cores)
+    with WorkerPool(n_cores, SPACY_MODEL) as pool:
+        with instrumentation.stage("Parallel engine", df["content"]) as stage:
+            if work_dir:
+                config = {"pipeline_version": PIPELINE_VERSION, "model": SPACY_MODEL, "num_2_word": num_2_word}
+                job = PreprocessJob(work_dir, input_path, config)
+                output_df = preprocess_resumable(df, pool, job, num_2_word=num_2_word, stage=stage)
+            else:
+                output_df = preprocess_parallel(df, pool, num_2_word=num_2_word, stage=stage)
 
-    # Join files back together
-    all_df = [pd.read_csv(f) for f in filenames]
-    output_df = pd.concat(all_df)
     output_df.to_csv(output_path, index=False)
+    return output_df
+
+
+def compare(input_path, n_cores, num_2_word=False, instrumentation=None):
+    instrumentation = instrumentation or Instrumentation()
+    texts = pd.read_csv(input_path)["content"].astype(str)
+    with Preprocess(
+        input_path, num_2_word=num_2_word, n_cores=n_cores, instrumentation=instrumentation
+    ) as preprocessor:
+        with instrumentation.stage("Preprocess.preprocess_tickets", texts):
+            preprocessor.preprocess_tickets()
 
 
 if __name__ == "__main__":
@@ -86,18 +66,30 @@ if __name__ == "__main__":
     parser.add_argument(
         "--output_file", help="the relative path to the output CSV file (will be overwritten if exists)"
     )
+    parser.add_argument("--n_cores", type=int, default=multiprocessing.cpu_count(), help="number of worker processes")
+    parser.add_argument("--num_2_word", action="store_true", help="convert numbers to words")
+    parser.add_argument("--work_dir", help="checkpoint the preprocessed chunks in this directory to resume the job")
+    parser.add_argument("--metrics_file", help="append the metrics of every stage to this JSON lines file")
+    parser.add_argument(
+        "--compare", action="store_true", help="also run Preprocess.preprocess_tickets and compare the throughput"
+    )
 
     args = parser.parse_args()
     path = pathlib.Path()
-    input_path = None
-    output_path = None
-
-    if args.input_file:
-        input_path = path / args.input_file
-    if args.output_file:
-        output_path = path / args.output_file
-
-    if input_path and not output_path:
-        split(input_path)
-    elif input_path and output_path:
-        preprocess_file(input_path, output_path)
+    input_path = path / args.input_file
+    output_path = path / args.output_file if args.output_file else default_output_path(input_path)
+
+    callbacks = [print_stage] + ([JSONLinesWriter(args.metrics_file)] if args.metrics_file else [])
+    instrumentation = Instrumentation(callbacks)
+
+    preprocess_file(input_path, output_path, args.n_cores, args.num_2_word, instrumentation, args.work_dir)
+    print(f"Wrote {output_path}")
+
+    if args.compare:
+        compare(input_path, args.n_cores, args.num_2_word, instrumentation)
+        engine, baseline = instrumentation.stages[0], instrumentation.stages[-1]
+        print(
+            f"Parallel engine: {engine['docs_per_sec']:.1f} docs/sec, "
+            f"Preprocess.preprocess_tickets: {baseline['docs_per_sec']:.1f} docs/sec, "
+            f"speedup {baseline['wall_time'] / engine['wall_time']:.2f}x"
+        )
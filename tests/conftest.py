@@ -0,0 +1,78 @@
+import types
+
+import pytest
+
+STUB_STOP_WORDS = frozenset(["a", "is", "the"])
+
+
+class StubLexeme:
+    def __init__(self, is_stop):
+        self.is_stop = is_stop
+
+
+class StubVocab(dict):
+    def __missing__(self, text):
+        lexeme = self[text] = StubLexeme(text.lower() in STUB_STOP_WORDS)
+        return lexeme
+
+
+class StubToken:
+    def __init__(self, text, vocab):
+        self.text = text
+        self.lemma_ = text[:-1] if text.endswith("s") else text
+        self.is_punct = not any(char.isalnum() for char in text)
+        self.is_stop = vocab[text].is_stop
+
+
+class StubDoc:
+    def __init__(self, text, vocab):
+        self.text = text
+        self._ = types.SimpleNamespace(language="en" if text.isascii() else "fr", language_score=1.0)
+        self._tokens = [StubToken(token, vocab) for token in text.split()]
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+
+class StubNLP:
+    """
+    Stands in for a spaCy model: splits on whitespace, lemmatizes by dropping a
+    trailing "s" and calls every ASCII text English.
+    """
+
+    meta = {"name": "stub", "version": "0.0.0"}
+
+    def __init__(self):
+        self.vocab = StubVocab()
+        self.pipe_names = []
+
+    def add_pipe(self, component, name):
+        self.pipe_names.append(name)
+
+    def pipe(self, texts, disable=None, **kwargs):
+        for text in texts:
+            yield StubDoc(text, self.vocab)
+
+
+@pytest.fixture
+def stub_nlp(monkeypatch):
+    """
+    Replace `spacy.load` by `StubNLP`, in this process and in the worker processes it forks.
+
+    :rtype: The list of the models loaded in this process
+    """
+    spacy = pytest.importorskip("spacy")
+    pytest.importorskip("langdetect")
+    from canosp2020 import worker_pool
+
+    loaded = []
+
+    def load(model):
+        nlp = StubNLP()
+        loaded.append(nlp)
+        return nlp
+
+    monkeypatch.setattr(spacy, "load", load)
+    monkeypatch.setattr(worker_pool, "_models", {})
+    monkeypatch.setattr(worker_pool, "_worker_nlp", None)
+    return loaded
@@ -0,0 +1,31 @@
+import gzip
+import json
+
+from canosp2020.archive import TicketArchive
+
+
+def make_tickets(ids):
+    return [{"ticket_id": ticket_id, "title": f"title {ticket_id}", "content": "é" * ticket_id} for ticket_id in ids]
+
+
+def test_append_and_read(tmp_path):
+    archive = TicketArchive(str(tmp_path), segment_bytes=100, block_size=2)
+    archive.append(make_tickets(range(1, 6)))
+    archive.append(make_tickets(range(6, 9)))
+
+    assert len(archive.segments()) > 1
+    assert [ticket["ticket_id"] for ticket in archive.iter_tickets()] == list(range(1, 9))
+
+    # a fresh reader only uses the index file
+    archive = TicketArchive(str(tmp_path))
+    assert archive.get(7) == make_tickets([7])[0]
+    assert archive.get("3") == make_tickets([3])[0]
+    assert archive.get(42) is None
+    assert 5 in archive
+
+
+def test_segments_are_plain_gzip(tmp_path):
+    archive = TicketArchive(str(tmp_path), block_size=2)
+    archive.append(make_tickets(range(1, 6)))
+    with gzip.open(archive.segments()[0], "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["ticket_id"] for line in f] == [1, 2, 3, 4, 5]
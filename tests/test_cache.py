@@ -0,0 +1,72 @@
+import itertools
+
+import pytest
+
+from canosp2020 import cache
+from canosp2020.cache import TicketCache, hash_ticket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # every call to time.time() is a tick later, so no two uses of the cache happen at the same time
+    ticks = itertools.count(1)
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(ticks)))
+
+
+def entry(key):
+    return key, f"{key} title", f"{key} content", "en"
+
+
+def test_hits_and_misses(tmp_path):
+    ticket_cache = TicketCache(str(tmp_path / "cache.sqlite"))
+    ticket_cache.put_many([entry("a"), entry("b")])
+
+    assert ticket_cache.get_many(["a", "c", "a", "b"]) == {
+        "a": ("a title", "a content", "en"),
+        "b": ("b title", "b content", "en"),
+    }
+    assert ticket_cache.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75, "evictions": 0, "entries": 2}
+
+
+def test_persistent(tmp_path):
+    path = str(tmp_path / "data" / "cache.sqlite")
+    ticket_cache = TicketCache(path)
+    ticket_cache.put_many([entry("a")])
+    ticket_cache.close()
+
+    ticket_cache = TicketCache(path)
+    assert ticket_cache.get_many(["a"]) == {"a": ("a title", "a content", "en")}
+    assert ticket_cache.stats()["hit_rate"] == 1.0
+
+
+def test_evict_least_recently_used(tmp_path, clock):
+    ticket_cache = TicketCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    ticket_cache.put_many([entry("a")])
+    ticket_cache.put_many([entry("b")])
+    # using "a" makes "b" the least recently used entry
+    ticket_cache.get_many(["a"])
+    ticket_cache.put_many([entry("c")])
+
+    assert len(ticket_cache) == 2
+    assert set(ticket_cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert ticket_cache.stats()["evictions"] == 1
+
+    ticket_cache.put_many([entry("d"), entry("e"), entry("f")])
+    assert len(ticket_cache) == 2
+    assert ticket_cache.stats()["evictions"] == 4
+
+
+def test_fingerprint_invalidates(tmp_path):
+    ticket_cache = TicketCache(str(tmp_path / "cache.sqlite"))
+    key = hash_ticket("Crash", "Firefox crashes", "en_core_web_sm:lemma")
+    ticket_cache.put_many([(key, "crash", "firefox crash", "en")])
+
+    assert hash_ticket("Crash", "Firefox crashes", "en_core_web_sm:lemma") == key
+    # a different pipeline configuration or raw text is a different entry
+    other_keys = [
+        hash_ticket("Crash", "Firefox crashes", "en_core_web_md:lemma"),
+        hash_ticket("Crash", "Firefox crashes!", "en_core_web_sm:lemma"),
+        hash_ticket("CrashF", "irefox crashes", "en_core_web_sm:lemma"),
+    ]
+    assert ticket_cache.get_many(other_keys) == {}
+    assert list(ticket_cache.get_many([key])) == [key]
@@ -0,0 +1,71 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+for module in ("gensim", "nltk", "num2words", "pyarrow", "requests_html", "spacy"):
+    pytest.importorskip(module)
+
+from canosp2020.engine import from_ipc, preprocess_parallel, preprocess_resumable, to_ipc  # noqa: E402
+from canosp2020.instrumentation import Instrumentation  # noqa: E402
+from canosp2020.jobs import PreprocessJob  # noqa: E402
+from canosp2020.preprocessing import Preprocess  # noqa: E402
+from canosp2020.worker_pool import SPACY_MODEL, WorkerPool  # noqa: E402
+
+TICKETS = pd.DataFrame(
+    {
+        "id": [1, 2, 3, 4],
+        "title": ["Firefox crashes", "Tabs are slow", "Sync is broken", "Où sont mes onglets"],
+        "content": [
+            "<p>The browser crashes on start</p>",
+            "Opening 2 tabs takes 30 seconds",
+            "Bookmarks are not synced since version 72",
+            "Mes onglets ont disparu après la mise à jour",
+        ],
+    }
+)
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "tickets.csv"
+    TICKETS.to_csv(path, index=False)
+    return str(path)
+
+
+def test_same_output_as_preprocess(input_file, stub_nlp):
+    stopwords = ["firefox", "tabs"]
+    with Preprocess(
+        input_file, stopwords=stopwords, num_2_word=True, n_cores=2, instrumentation=Instrumentation([])
+    ) as preprocessor:
+        preprocessor.preprocess_tickets()
+        expected = preprocessor._df
+
+    with WorkerPool(2, SPACY_MODEL, stopwords) as pool:
+        df = preprocess_parallel(Preprocess._read_df(pd.read_csv(input_file)), pool, num_2_word=True)
+
+    assert df["title"].tolist() == ["crashe", "are slow", "sync broken", "où sont me onglet"]
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def test_ipc_round_trip():
+    df = TICKETS.iloc[1:].assign(lang=["en", None, "fr"])
+    pd.testing.assert_frame_equal(from_ipc(to_ipc(df)), df)
+
+
+def test_resume(tmp_path, input_file, stub_nlp):
+    df = Preprocess._read_df(pd.read_csv(input_file))
+    config = {"num_2_word": False}
+
+    # a previous run died after its first chunk
+    job = PreprocessJob(str(tmp_path / "job"), input_file, config)
+    job.start([(0, 2), (2, 4)])
+    job.save_chunk(0, df.iloc[0:2].assign(title="done before", lang="en", title_content=""))
+
+    job = PreprocessJob(str(tmp_path / "job"), input_file, config)
+    with WorkerPool(2) as pool:
+        resumed = preprocess_resumable(df, pool, job)
+        expected = preprocess_parallel(df.copy(), pool)
+
+    assert job.pending() == []
+    assert resumed["id"].tolist() == [1, 2, 3, 4]
+    assert resumed["title"].tolist()[:2] == ["done before", "done before"]
+    pd.testing.assert_frame_equal(resumed.iloc[2:], expected.iloc[2:], check_dtype=False)
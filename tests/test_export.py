@@ -0,0 +1,112 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from canosp2020.export import TicketWriter, export_tickets  # noqa: E402
+from json_to_crowdtruth_csv import CrowdTruthWriter  # noqa: E402
+from ticket_to_csv import TicketCSVWriter, ticket_writer  # noqa: E402
+
+TAGGERS = [
+    {"tagger_id": "0", "is_expert": False, "is_sumo": True},
+    {"tagger_id": "3", "is_expert": True, "is_sumo": False},
+]
+
+TICKETS = [
+    {
+        "ticket_id": "1",
+        "title": "Crash, again",
+        "content": "a\nb",
+        "timestamp": 1,
+        "tags": {"0": ["crash"], "3": ["a"]},
+    },
+    {"ticket_id": 2, "title": "Slow", "content": "c", "timestamp": 2, "tags": {"0": []}},
+    {"ticket_id": 1, "title": "Duplicate", "content": "d", "timestamp": 1, "tags": {"0": []}},
+]
+
+
+class ListWriter(TicketWriter):
+    def __init__(self):
+        self.tickets = []
+
+    def write(self, ticket):
+        self.tickets.append(ticket)
+
+
+def test_single_pass(tmp_path):
+    json_path = tmp_path / "tickets.json"
+    json_path.write_text(json.dumps({"taggers": TAGGERS, "tickets": TICKETS}))
+
+    tickets = ListWriter()
+    stats = export_tickets(
+        json_path, [TicketCSVWriter(tmp_path / "tickets.csv"), CrowdTruthWriter(tmp_path / "crowdtruth.csv"), tickets]
+    )
+
+    assert (stats.total_tickets, stats.unique_tickets, stats.duplicates) == (3, 2, 1)
+    assert tickets.tickets == TICKETS[:2]
+    with open(tmp_path / "tickets.csv", newline="") as f:
+        assert list(csv.reader(f)) == [
+            ["id", "title", "content", "0", "3"],
+            ["1", "Crash again", "ab", "crash", "a"],
+            ["2", "Slow", "c", "", ""],
+        ]
+    with open(tmp_path / "crowdtruth.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert [row[0] for row in rows[1:]] == ["1"]
+
+
+def test_crowdtruth_append(tmp_path):
+    json_path = tmp_path / "tickets.json"
+    csv_path = tmp_path / "crowdtruth.csv"
+
+    json_path.write_text(json.dumps({"taggers": TAGGERS, "tickets": TICKETS}))
+    export_tickets(json_path, [CrowdTruthWriter(csv_path)])
+
+    tickets = TICKETS + [{"ticket_id": 4, "title": "", "content": "", "timestamp": 4, "tags": {"3": [], "5": ["b"]}}]
+    json_path.write_text(json.dumps({"taggers": TAGGERS, "tickets": tickets}))
+    export_tickets(json_path, [CrowdTruthWriter(csv_path, append=True)])
+    # state is not shared between exports
+    export_tickets(json_path, [CrowdTruthWriter(tmp_path / "again.csv")])
+
+    with open(csv_path, newline="") as f:
+        rows = [(row[0], row[2], row[4], row[5]) for row in csv.reader(f)]
+    assert rows == [
+        ("_unit_id", "_id", "_worker_id", "keywords"),
+        ("1", "0", "3", '["a"]'),
+        ("4", "1", "3", "[]"),
+        ("4", "2", "5", '["b"]'),
+    ]
+    with open(tmp_path / "again.csv", newline="") as f:
+        assert len(list(csv.reader(f))) == 4
+
+
+def test_compressed_and_parquet(tmp_path):
+    json_path = tmp_path / "tickets.json"
+    json_path.write_text(json.dumps({"taggers": TAGGERS, "tickets": TICKETS}))
+    export_tickets(
+        json_path, [ticket_writer(tmp_path / name) for name in ("tickets.csv", "tickets.csv.gz", "tickets.parquet")]
+    )
+
+    with open(tmp_path / "tickets.csv", newline="") as f, gzip.open(tmp_path / "tickets.csv.gz", "rt", newline="") as g:
+        assert list(csv.reader(g)) == list(csv.reader(f))
+
+    table = pq.read_table(tmp_path / "tickets.parquet")
+    assert table.column_names == ["id", "title", "content", "0", "3"]
+    assert table.to_pylist() == [
+        {"id": "1", "title": "Crash, again", "content": "a\nb", "0": ["crash"], "3": ["a"]},
+        {"id": "2", "title": "Slow", "content": "c", "0": [], "3": None},
+    ]
+
+
+def test_zstandard(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    json_path = tmp_path / "tickets.json"
+    json_path.write_text(json.dumps({"taggers": TAGGERS, "tickets": TICKETS}))
+    export_tickets(json_path, [ticket_writer(tmp_path / name) for name in ("tickets.csv", "tickets.csv.zst")])
+
+    with open(tmp_path / "tickets.csv", newline="") as f:
+        with zstandard.open(tmp_path / "tickets.csv.zst", "rt", encoding="utf-8", newline="") as z:
+            assert list(csv.reader(z)) == list(csv.reader(f))
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from canosp2020.external_sort import external_sort, unique_by
+
+
+def test_sort_across_runs():
+    rng = random.Random(0)
+    items = [{"id": rng.randrange(50), "position": position} for position in range(1000)]
+
+    # 1000 items in runs of 7 spill to 143 files
+    result = list(external_sort(items, key=lambda item: item["id"], run_size=7))
+    assert result == sorted(items, key=lambda item: item["id"])
+
+
+def test_sort_is_stable():
+    items = [{"id": position % 3, "position": position} for position in range(20)]
+
+    result = list(external_sort(items, key=lambda item: item["id"], run_size=4))
+    for item_id in range(3):
+        positions = [item["position"] for item in result if item["id"] == item_id]
+        assert positions == sorted(positions)
+
+
+def test_sort_empty():
+    assert list(external_sort([], key=lambda item: item["id"])) == []
+
+
+@pytest.mark.parametrize("keep,expected", [("first", [0, 2, 5]), ("last", [1, 4, 5])])
+def test_unique_by(keep, expected):
+    items = [{"id": 1, "copy": 0}, {"id": 1, "copy": 1}, {"id": 2, "copy": 2}]
+    items += [{"id": 2, "copy": 3}, {"id": 2, "copy": 4}, {"id": 3, "copy": 5}]
+
+    result = unique_by(items, key=lambda item: item["id"], keep=keep)
+    assert [item["copy"] for item in result] == expected
+
+
+def test_unique_by_after_sort():
+    items = [{"id": 2, "copy": 0}, {"id": 1, "copy": 1}, {"id": 2, "copy": 2}, {"id": 1, "copy": 3}]
+
+    def key(item):
+        return item["id"]
+
+    assert [item["copy"] for item in unique_by(external_sort(items, key, run_size=1), key, keep="last")] == [3, 2]
+    assert list(unique_by([], key, keep="last")) == []
+    with pytest.raises(ValueError):
+        list(unique_by(items, key, keep="middle"))
@@ -0,0 +1,172 @@
+import json
+
+import pytest
+
+pytest.importorskip("click")
+pytest.importorskip("pandas")
+pytest.importorskip("pytz")
+pytest.importorskip("requests")
+
+import fetch_ticket  # noqa: E402
+
+from canosp2020.archive import TicketArchive  # noqa: E402
+
+
+def make_ticket(ticket_id, title, sumo_tags):
+    return {"ticket_id": ticket_id, "title": title, "content": "", "timestamp": 1579000000, "tags": {"0": sumo_tags}}
+
+
+def test_merge_keeps_the_latest_copy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "taggers.csv").write_text("name,tagger_id,is_expert\nann,3,1\n")
+    (tmp_path / "data" / "annotated_tickets.csv").write_text("url,tags,tagger_id,ticket_id\nu,a;b,3,2\n")
+
+    archive = TicketArchive("raw_data")
+    archive.append([make_ticket(2, "old title", []), make_ticket(1, "one", ["crash"])])
+    # a later fetch archives a new copy of ticket 2
+    archive.append([make_ticket(2, "edited title", ["sync"])])
+
+    fetch_ticket.merge_tickets()
+
+    with open("data/tickets.json") as f:
+        tickets = json.load(f)["tickets"]
+    assert archive.get(2)["title"] == "edited title"
+    assert [(ticket["ticket_id"], ticket["title"]) for ticket in tickets] == [(1, "one"), ("2", "edited title")]
+    assert tickets[1]["tags"] == {"0": ["sync"], "3": ["a", "b"]}
+
+
+@pytest.mark.parametrize(
+    "created",
+    [
+        ["2019-01-15T12:00:00Z", "2019-07-15T12:00:00Z"],
+        # spring forward, 2:30 does not exist
+        ["2019-03-10T01:59:59Z", "2019-03-10T02:30:00Z", "2019-03-10T03:00:00Z"],
+        # fall back, 1:30 happens twice
+        ["2019-11-03T00:59:59Z", "2019-11-03T01:30:00Z", "2019-11-03T02:00:00Z"],
+    ],
+)
+def test_convert_pst_to_utc_many(created):
+    assert fetch_ticket.convert_pst_to_utc_many(created) == [fetch_ticket.convert_pst_to_utc(t) for t in created]
+
+
+def test_convert_pst_to_utc_many_empty():
+    assert fetch_ticket.convert_pst_to_utc_many([]) == []
+
+
+def question(ticket_id, hour):
+    return {
+        "id": ticket_id,
+        "title": f"title {ticket_id}",
+        "content": "",
+        "created": f"2020-02-01T{hour}:00:00Z",
+        "tags": [],
+    }
+
+
+class FakeFetcher:
+    """Serves `pages`, newest first, a page that is None fails."""
+
+    pages = {}
+    queries = []
+    options = []
+
+    def __init__(self, api_url, params, **kwargs):
+        self.queries.append(params)
+        self.options.append(kwargs)
+        self.failed = {}
+
+    def fetch_page(self, page):
+        if self.pages[page] is None:
+            raise fetch_ticket.FetchError(f"page {page} failed")
+        return {"count": 20 * len(self.pages), "results": self.pages[page], "next": None}
+
+    def fetch_pages(self, pages):
+        for page in pages:
+            try:
+                yield page, self.fetch_page(page)
+            except fetch_ticket.FetchError as e:
+                self.failed[page] = str(e)
+
+    def report(self):
+        return ""
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_fetcher(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fetch_ticket, "PageFetcher", FakeFetcher)
+    monkeypatch.setattr(FakeFetcher, "pages", {})
+    monkeypatch.setattr(FakeFetcher, "queries", [])
+    monkeypatch.setattr(FakeFetcher, "options", [])
+    return FakeFetcher
+
+
+def test_sync_fetches_failed_pages_again(fake_fetcher):
+    fake_fetcher.pages = {1: [question(30, 12)], 2: None, 3: [question(10, 10), question(9, 9)]}
+    fetch_ticket.get_question_data("https://example.com/api/2/question", {})
+
+    # page 3 is older than the failed page, it is the newest page archived without gaps
+    assert fetch_ticket.read_watermark()["ticket_id"] == 10
+
+    fake_fetcher.pages = {1: [question(30, 12), question(20, 11), question(10, 10)]}
+    fetch_ticket.sync_sumo_tagged()
+
+    # an hour of overlap before ticket 10
+    assert fake_fetcher.queries[-1]["created__gt"] == "2020-02-01 09:00:00"
+    assert TicketArchive("raw_data").get(20)["title"] == "title 20"
+    assert fetch_ticket.read_watermark()["ticket_id"] == 30
+
+
+def test_sync_fetches_everything_after_failed_last_page(fake_fetcher):
+    fake_fetcher.pages = {1: [question(30, 12)], 2: [question(20, 11)], 3: None}
+    fetch_ticket.get_question_data("https://example.com/api/2/question", {})
+
+    # no page is older than the failed one, the archived tickets must not be used as a watermark
+    assert TicketArchive("raw_data").get(30)["title"] == "title 30"
+    assert fetch_ticket.read_watermark() is None
+
+    fake_fetcher.pages = {1: [question(30, 12), question(20, 11), question(10, 10)]}
+    fetch_ticket.sync_sumo_tagged()
+
+    # a full fetch
+    assert fake_fetcher.queries[-1] == {**fetch_ticket.SUMO_QUESTIONS_QUERY, "created__gt": "2020-01-16 00:00:00"}
+    assert TicketArchive("raw_data").get(10)["title"] == "title 10"
+    assert fetch_ticket.read_watermark()["ticket_id"] == 30
+
+
+def test_read_watermark_from_pages(tmp_path):
+    raw_data = tmp_path / "raw_data"
+    assert fetch_ticket.read_watermark(str(raw_data)) is None
+    raw_data.mkdir()
+    assert fetch_ticket.read_watermark(str(raw_data)) is None
+
+    TicketArchive(str(raw_data)).append(
+        [make_ticket(2, "two", []), make_ticket(7, "seven", []), make_ticket(5, "", [])]
+    )
+    assert fetch_ticket.read_watermark(str(raw_data)) == {"ticket_id": 7, "timestamp": 1579000000}
+
+
+def test_iter_pages_streams_legacy_files(tmp_path):
+    raw_data = tmp_path / "raw_data"
+    raw_data.mkdir()
+    (raw_data / "tickets.json").write_text(json.dumps({"taggers": [], "tickets": [make_ticket(1, "one", [])]}))
+    (raw_data / "tickets_1.json").write_text(json.dumps([make_ticket(2, "two", []), make_ticket(3, "three", [])]))
+    TicketArchive(str(raw_data)).append([make_ticket(4, "four", [])])
+
+    # the legacy files come in name order, then the archive
+    assert [ticket["ticket_id"] for ticket in fetch_ticket.iter_pages(str(raw_data))] == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("command", ["fetch", "sync"])
+def test_cli_fetcher_options(fake_fetcher, command):
+    from click.testing import CliRunner
+
+    fake_fetcher.pages = {1: [question(1, "08")]}
+    result = CliRunner().invoke(fetch_ticket.main, [command, "--concurrency", "2", "--rate", "0.5"])
+
+    assert result.exit_code == 0, result.output
+    assert fake_fetcher.options == [{"concurrency": 2, "rate": 0.5}]
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("requests")
+
+from canosp2020.fetcher import FetchError, PageFetcher, TokenBucket  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Page 3 is rate limited once, page 4 fails once, page 5 always fails and page 6 does not exist.
+    """
+
+    def do_GET(self):
+        page = int(parse_qs(urlparse(self.path).query)["page"][0])
+        with self.server.lock:
+            self.server.calls[page] = self.server.calls.get(page, 0) + 1
+            calls = self.server.calls[page]
+
+        if page == 3 and calls == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+        elif (page == 4 and calls == 1) or page == 5:
+            self.send_response(503)
+            self.end_headers()
+        elif page == 6:
+            self.send_response(404)
+            self.end_headers()
+        else:
+            body = json.dumps({"page": page}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.calls = {}
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_pages(server):
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/2/question"
+    fetcher = PageFetcher(url, {"format": "json"}, concurrency=4, rate=1000, max_retries=2, backoff=0.01)
+
+    fetched = dict(fetcher.fetch_pages(range(1, 8)))
+    fetcher.close()
+
+    assert fetched == {page: {"page": page} for page in (1, 2, 3, 4, 7)}
+    assert sorted(fetcher.failed) == [5, 6]
+    assert fetcher.failed[5] == "page 5: HTTP 503"
+    # 404 is not retried, 503 is retried until max_retries
+    assert server.calls[5] == 3
+    assert server.calls[6] == 1
+    assert fetcher.retries == 4
+    assert "2 pages failed" in fetcher.report()
+
+
+def test_fetch_page_raises(server):
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    fetcher = PageFetcher(url, max_retries=1, backoff=0.01)
+    with pytest.raises(FetchError):
+        fetcher.fetch_page(5)
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
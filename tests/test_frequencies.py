@@ -0,0 +1,53 @@
+import json
+
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("langdetect")
+pytest.importorskip("spacy")
+
+from canosp2020.frequencies import FREQUENCIES_SUFFIX, load_frequencies, save_frequencies  # noqa: E402
+
+
+def test_save_and_load(tmp_path):
+    input_file = str(tmp_path / "tickets.csv")
+    counter = Counter({"firefox": 3, "crash": 3, "tab": 1})
+
+    assert load_frequencies(input_file, "a") is None
+    save_frequencies(input_file, "a", counter)
+
+    loaded = load_frequencies(input_file, "a")
+    assert loaded == counter
+    # ties keep their order
+    assert loaded.most_common() == counter.most_common()
+    assert load_frequencies(input_file, "b") is None
+
+    with open(input_file + FREQUENCIES_SUFFIX, "w") as f:
+        f.write('{"fingerprint": "a", "counts": [[')
+    assert load_frequencies(input_file, "a") is None
+
+
+def test_stop_words_use_the_cache(tmp_path, stub_nlp, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    for module in ("gensim", "nltk", "num2words", "requests_html"):
+        pytest.importorskip(module)
+    from canosp2020 import preprocessing
+
+    input_file = tmp_path / "tickets.csv"
+    pd.DataFrame({"title": ["crash crash", "crash"], "content": ["tab", "sync"]}).to_csv(input_file, index=False)
+    assert preprocessing.Preprocess.get_stop_words(str(input_file), threshold=0.34, n_cores=2) == ["crash"]
+    with open(str(input_file) + FREQUENCIES_SUFFIX) as f:
+        assert dict(json.load(f)["counts"]) == {"crash": 3, "tab": 1, "sync": 1}
+
+    class NoPool:
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("the tokens were counted again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(preprocessing, "WorkerPool", NoPool)
+        assert preprocessing.Preprocess.get_stop_words(str(input_file), threshold=0.34, n_cores=2) == ["crash"]
+
+    # a changed file is counted again
+    pd.DataFrame({"title": ["tab tab", "tab"], "content": ["crash", "sync"]}).to_csv(input_file, index=False)
+    assert preprocessing.Preprocess.get_stop_words(str(input_file), threshold=0.34, n_cores=2) == ["tab"]
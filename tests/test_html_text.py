@@ -0,0 +1,32 @@
+import pytest
+
+from canosp2020.html_text import HTMLTextExtractor, html_to_text
+
+# Expected outputs of requests_html.HTML(html=text).text
+CASES = [
+    ("<p>Firefox <b>72</b> crashes</p><p>on start</p>", "Firefox 72 crashes\non start"),
+    ("<ul><li>one</li><li>two</li></ul>", "one\ntwo"),
+    ("<p>line<br>break</p>", "line\nbreak"),
+    ("before <p>kept</p> between <p>kept</p> after", "kept\nbetween\nkept"),
+    ("<p>&amp;lt;b&amp;gt; &copy &foo;</p>", "<b> © &foo"),
+    ("<p>&#150; &#x41;</p>", "– A"),
+    ("<p>x</p><!-- comment --><![CDATA[data]]><p>y</p>", "x\ndata\ny"),
+    ("<b>x<foo>y</b>z", "x\ny"),
+    ("plain text, no markup", "plain text, no markup"),
+]
+
+
+@pytest.mark.parametrize("html,expected", CASES)
+def test_html_to_text(html, expected):
+    assert " ".join(html_to_text(html).split()) == " ".join(expected.split())
+
+
+def test_extractor_is_reusable():
+    extractor = HTMLTextExtractor()
+    for html, expected in CASES:
+        assert " ".join(html_to_text(html, extractor).split()) == " ".join(expected.split())
+
+
+@pytest.mark.parametrize("html", ["<!-- only a comment -->", "<html><p>x</p></html>", "<p>\x0c</p>"])
+def test_unsupported_documents(html):
+    assert html_to_text(html) is None
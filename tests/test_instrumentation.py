@@ -0,0 +1,41 @@
+import json
+import multiprocessing
+
+from canosp2020.instrumentation import Instrumentation, JSONLinesWriter, print_stage
+
+
+def test_stage_metrics_and_callbacks(tmp_path, capsys):
+    path = tmp_path / "metrics.jsonl"
+    received = []
+    instrumentation = Instrumentation([received.append, JSONLinesWriter(str(path)), print_stage])
+
+    texts = ["firefox crashes", "slow", None]
+    chunks = [[1, 2], [3], [4, 5, 6]]
+    with instrumentation.stage("Sum", texts) as stage:
+        with multiprocessing.Pool(2) as pool:
+            results = list(stage.collect(pool.imap(stage.timed(sum), chunks)))
+    with instrumentation.stage("Nothing") as stage:
+        stage.extra = {"hits": 2}
+
+    assert results == [3, 3, 15]
+    assert received == instrumentation.stages
+    assert [json.loads(line) for line in path.read_text().splitlines()] == received
+
+    metrics, nothing = received
+    assert (metrics["stage"], metrics["docs"], metrics["chars"]) == ("Sum", 3, 19)
+    assert metrics["wall_time"] > 0 and metrics["docs_per_sec"] > 0
+    assert sum(worker["chunks"] for worker in metrics["workers"].values()) == 3
+    assert metrics["chunk_skew"] >= 1.0
+    assert (nothing["docs"], nothing["workers"], nothing["chunk_skew"]) == (0, {}, None)
+    assert (metrics["extra"], nothing["extra"]) == ({}, {"hits": 2})
+
+    printed = capsys.readouterr().out.splitlines()
+    assert printed[0].startswith("Sum: ") and "docs/sec, chunk skew" in printed[0]
+    assert printed[1].startswith("Nothing: ") and printed[1].endswith("), hits 2")
+
+
+def test_to_json():
+    instrumentation = Instrumentation([])
+    with instrumentation.stage("Empty", []):
+        pass
+    assert [stage["stage"] for stage in json.loads(instrumentation.to_json())] == ["Empty"]
@@ -0,0 +1,45 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from canosp2020.jobs import IncompleteJob, PreprocessJob  # noqa: E402
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "tickets.csv"
+    pd.DataFrame({"title": ["a", "b", "c", "d"], "content": ["1", "2", "3", "4"]}).to_csv(path, index=False)
+    return str(path)
+
+
+def preprocess(df):
+    return df.assign(title=df["title"].str.upper())
+
+
+def test_resume_skips_done_chunks(tmp_path, input_file):
+    df = pd.read_csv(input_file)
+    work_dir = str(tmp_path / "job")
+
+    job = PreprocessJob(work_dir, input_file, {"num_2_word": False})
+    bounds = job.start([(0, 2), (2, 4)])
+    job.save_chunk(0, preprocess(df.iloc[slice(*bounds[0])]))
+    with pytest.raises(IncompleteJob):
+        job.assemble()
+
+    job = PreprocessJob(work_dir, input_file, {"num_2_word": False})
+    bounds = job.start([(0, 1), (1, 2), (2, 3), (3, 4)])
+    assert bounds == [(0, 2), (2, 4)]
+    assert job.pending() == [1]
+    job.save_chunk(1, preprocess(df.iloc[slice(*bounds[1])]))
+    assert job.assemble()["title"].tolist() == ["A", "B", "C", "D"]
+
+
+def test_changed_config_restarts(tmp_path, input_file):
+    work_dir = str(tmp_path / "job")
+    job = PreprocessJob(work_dir, input_file, {"num_2_word": False})
+    job.start([(0, 4)])
+    job.save_chunk(0, pd.read_csv(input_file))
+
+    job = PreprocessJob(work_dir, input_file, {"num_2_word": True})
+    job.start([(0, 4)])
+    assert job.pending() == [0]
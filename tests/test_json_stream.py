@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from canosp2020.json_stream import iter_items, iter_members, read_json_tickets
+
+TAGGERS = [{"tagger_id": "0", "is_expert": False, "is_sumo": True}]
+
+TICKETS = [
+    {"ticket_id": 1282919, "title": 'a "quoted" title', "content": "é\n\\u00e9 ✓", "timestamp": 1579000000, "tags": {}},
+    {"ticket_id": "2", "title": "", "content": "[{,}]", "timestamp": 1.5e9, "tags": {"0": ["crash", "slow"]}},
+]
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 64 * 1024])
+def test_taggers_first(tmp_path, read_size):
+    path = tmp_path / "tickets.json"
+    path.write_text(json.dumps({"created_timestamp": "1", "taggers": TAGGERS, "tickets": TICKETS}, indent=2))
+
+    taggers, tickets = read_json_tickets(path, read_size)
+    assert taggers == TAGGERS
+    assert list(tickets) == TICKETS
+
+
+@pytest.mark.parametrize("read_size", [3, 64 * 1024])
+def test_taggers_last(tmp_path, read_size):
+    path = tmp_path / "tickets.json"
+    path.write_text(json.dumps({"tickets": TICKETS, "taggers": TAGGERS, "last_updated_timestamp": 12345}))
+
+    taggers, tickets = read_json_tickets(path, read_size)
+    assert taggers == TAGGERS
+    assert list(tickets) == TICKETS
+
+
+def test_members(tmp_path):
+    path = tmp_path / "tickets.json"
+    path.write_text('{"count": 12345, "tickets": [], "flag": true}')
+    assert list(iter_members(path, read_size=2)) == [("count", 12345), ("flag", True)]
+
+    path.write_text('{"tickets": [1, 2')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_members(path, read_size=2))
+
+
+@pytest.mark.parametrize("read_size", [1, 64 * 1024])
+def test_items(tmp_path, read_size):
+    path = tmp_path / "tickets_1.json"
+    path.write_text(json.dumps(TICKETS, indent=2))
+    assert list(iter_items(path, read_size)) == TICKETS
+
+    path.write_text(" [ ] ")
+    assert list(iter_items(path, read_size)) == []
@@ -0,0 +1,74 @@
+import collections
+import types
+
+import pytest
+
+pytest.importorskip("langdetect")
+
+from canosp2020 import language_dector  # noqa: E402
+from canosp2020.language_dector import detect_languages, is_obviously_english  # noqa: E402
+
+ENGLISH = "Firefox keeps crashing when I open a new tab"
+FRENCH = "Firefox plante au démarrage de l'ordinateur depuis la mise à jour"
+GERMAN = "Der Browser stürzt beim Öffnen eines neuen Tabs ab"
+
+
+@pytest.fixture
+def memo(monkeypatch):
+    memo = collections.OrderedDict()
+    monkeypatch.setattr(language_dector, "_memo", memo)
+    return memo
+
+
+@pytest.fixture
+def detected(monkeypatch):
+    texts = []
+    detect = language_dector._detect
+
+    def counting_detect(text):
+        texts.append(text)
+        return detect(text)
+
+    monkeypatch.setattr(language_dector, "_detect", counting_detect)
+    return texts
+
+
+def test_is_obviously_english():
+    assert is_obviously_english(ENGLISH)
+    assert is_obviously_english("The page is blank and I can not do anything about it")
+    # too short, not ASCII, or not enough common English words
+    assert not is_obviously_english("Firefox is slow")
+    assert not is_obviously_english("Die Seite ist leer und ich kann nichts mehr tun, über das Menü")
+    assert not is_obviously_english("Firefox plante au demarrage depuis la mise a jour")
+
+
+def test_detect_languages(memo):
+    results = detect_languages([ENGLISH, FRENCH, GERMAN, ""])
+
+    assert results[0] == {"language": "en", "score": language_dector.FAST_PATH_SCORE}
+    assert [result["language"] for result in results[1:]] == ["fr", "de", "UNKNOWN"]
+
+    # seeded, the same text gets the same result without the memo
+    memo.clear()
+    assert detect_languages([FRENCH, GERMAN]) == results[1:3]
+
+
+def test_docs_and_repeated_texts_are_detected_once(memo, detected):
+    doc = types.SimpleNamespace(text=FRENCH)
+
+    results = detect_languages([FRENCH, doc, FRENCH])
+    detect_languages([FRENCH])
+
+    assert detected == [FRENCH]
+    assert results[0] == results[1] == results[2]
+
+
+def test_memo_evicts_least_recently_used(memo, detected, monkeypatch):
+    monkeypatch.setattr(language_dector, "MEMO_SIZE", 2)
+
+    detect_languages([ENGLISH, FRENCH, ENGLISH, GERMAN])
+    assert len(memo) == 2
+
+    # the French text was used least recently, it is the one detected again
+    detect_languages([ENGLISH, GERMAN, FRENCH])
+    assert detected == [ENGLISH, FRENCH, GERMAN, FRENCH]
@@ -0,0 +1,58 @@
+import csv
+import json
+import time
+
+import create_mturk_csv
+from create_mturk_csv import issued_key, ticket_to_csv
+
+
+def test_issued_key():
+    assert issued_key("Firefox crashes!", "On startup.") == issued_key("firefox crashes", "on startup")
+    assert issued_key("Firefox crashes", "On startup") != issued_key("Firefox crashes", "When printing")
+    assert issued_key("Slow", "x" * 300) == issued_key("Slow", "x" * 200 + "y")
+
+
+def test_exclude_issued_tickets(tmp_path, monkeypatch):
+    # the selection does not depend on the cleaning, leave the texts as they are
+    monkeypatch.setattr(create_mturk_csv, "clean_text_pipeline", lambda: lambda text: {"CleanText": text})
+
+    now = int(time.time())
+    tickets = [
+        {"ticket_id": 1, "title": "Firefox crashes", "content": "On startup.", "timestamp": now, "tags": {}},
+        {"ticket_id": 2, "title": "Firefox crashes", "content": "When printing", "timestamp": now, "tags": {}},
+        {"ticket_id": 3, "title": "Slow", "content": "Very slow", "timestamp": now, "tags": {}},
+        {"ticket_id": 4, "title": "Old", "content": "Too old", "timestamp": now - 40 * 86400, "tags": {}},
+    ]
+    json_path = tmp_path / "tickets.json"
+    json_path.write_text(json.dumps({"taggers": [{"tagger_id": "0"}], "tickets": tickets}))
+
+    issued_path = tmp_path / "issued.csv"
+    with open(issued_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sumo-ticket-title", "sumo-ticket-text"])
+        writer.writerow(["firefox crashes", "on startup"])
+
+    csv_path = tmp_path / "mturk.csv"
+    ticket_to_csv(json_path, csv_path, 10, 0, 30, exclude_paths=[issued_path])
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    # the ticket with the same title but a different text is still sampled, the one older than the cutoff is not
+    assert sorted(row["sumo-ticket-text"] for row in rows) == ["Very slow", "When printing"]
+
+
+def test_human_tagged_tickets_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(create_mturk_csv, "clean_text_pipeline", lambda: lambda text: {"CleanText": text})
+
+    old = int(time.time()) - 40 * 86400
+    both = {"1": ["a"], "2": ["b"]}
+    tickets = [{"ticket_id": i, "title": f"t{i}", "content": f"c{i}", "timestamp": old, "tags": both} for i in range(5)]
+    tickets.append({"ticket_id": 5, "title": "t5", "content": "c5", "timestamp": old, "tags": {"1": ["a"]}})
+    json_path = tmp_path / "tickets.json"
+    json_path.write_text(json.dumps({"taggers": [{"tagger_id": "1"}, {"tagger_id": "2"}], "tickets": tickets}))
+
+    csv_path = tmp_path / "mturk.csv"
+    ticket_to_csv(json_path, csv_path, 3, 0, 30)
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    # old tickets are only kept when >= 2 humans tagged them, the first ones in input order
+    assert [row["sumo-ticket-title"] for row in rows] == ["t0", "t1", "t2"]
@@ -0,0 +1,39 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+num2words = pytest.importorskip("num2words").num2words
+
+from canosp2020.number_words import number_to_words, numbers_to_words  # noqa: E402
+
+
+def apply_num2words(text):
+    return " ".join(num2words(token) if token.isnumeric() else token for token in text.split())
+
+
+def test_numbers_to_words():
+    texts = pd.Series(
+        ["firefox 72 crashes", "no digits here", "v2 and 3.5 and 10", "", "2020", "tab 1 tab 1 tab 1"],
+        index=[5, 4, 3, 2, 1, 0],
+    )
+
+    converted = numbers_to_words(texts)
+
+    assert converted.tolist() == [
+        "firefox seventy-two crashes",
+        "no digits here",
+        "v2 and 3.5 and ten",
+        "",
+        "two thousand and twenty",
+        "tab one tab one tab one",
+    ]
+    assert converted.index.tolist() == [5, 4, 3, 2, 1, 0]
+    assert converted.tolist() == [apply_num2words(text) for text in texts]
+
+
+def test_every_number_is_converted_once():
+    number_to_words.cache_clear()
+
+    numbers_to_words(pd.Series(["1 and 1", "2 1", "no number"]))
+
+    info = number_to_words.cache_info()
+    assert (info.misses, info.hits) == (2, 2)
@@ -0,0 +1,106 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+for module in ("gensim", "nltk", "num2words", "pyarrow", "requests_html", "spacy"):
+    pytest.importorskip(module)
+
+from canosp2020 import preprocessing  # noqa: E402
+from canosp2020.instrumentation import Instrumentation  # noqa: E402
+from canosp2020.preprocessing import Preprocess  # noqa: E402
+from canosp2020.tokens import read_tokens  # noqa: E402
+
+TICKETS = pd.DataFrame(
+    {
+        "id": [1, 2, 3, 4, 5],
+        "title": ["Firefox crashes", "Tabs are slow", "Sync is broken", "Où sont mes onglets", "Video stutters"],
+        "content": [
+            "<p>The browser crashes on start</p>",
+            "Opening 2 tabs takes 30 seconds",
+            "<b>Bookmarks</b> are not synced, see https://example.com/sync",
+            "Mes onglets ont disparu après la mise à jour",
+            "Videos stutter after the update",
+        ],
+    }
+)
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "tickets.csv"
+    TICKETS.to_csv(path, index=False)
+    return str(path)
+
+
+def lemmatized_chunks(instrumentation):
+    return sum(stage["stage"] == "Spacy stream (content)" for stage in instrumentation.stages)
+
+
+@pytest.mark.parametrize("chunksize,chunks", [(None, 1), (2, 3)])
+def test_write_both_formats_in_one_pass(tmp_path, input_file, stub_nlp, chunksize, chunks):
+    instrumentation = Instrumentation([])
+    with Preprocess(input_file, n_cores=2, chunksize=chunksize, instrumentation=instrumentation) as preprocessor:
+        preprocessor.preprocess_to_files(str(tmp_path / "preprocessed.csv"), str(tmp_path / "tickets.parquet"))
+
+    assert lemmatized_chunks(instrumentation) == chunks
+    df = pd.read_csv(tmp_path / "preprocessed.csv")
+    tokens = read_tokens(str(tmp_path / "tickets.parquet"))
+    assert df["id"].tolist() == tokens["id"].tolist() == [1, 2, 3, 4, 5]
+    assert [list(row) for row in tokens["title_content_tokens"]] == [text.split() for text in df["title_content"]]
+
+
+def test_writers_reuse_preprocessed_tickets(tmp_path, input_file, stub_nlp):
+    instrumentation = Instrumentation([])
+    with Preprocess(input_file, n_cores=2, instrumentation=instrumentation) as preprocessor:
+        preprocessor.preprocess_tickets()
+        preprocessor.preprocess_to_csv(str(tmp_path / "preprocessed.csv"))
+        preprocessor.preprocess_to_parquet(str(tmp_path / "tickets.parquet"))
+        preprocessor.preprocess_tickets()
+
+    assert lemmatized_chunks(instrumentation) == 1
+    df = pd.read_csv(tmp_path / "preprocessed.csv")
+    assert df["title"].tolist() == [
+        "firefox crashe",
+        "tab are slow",
+        "sync broken",
+        "où sont me onglet",
+        "video stutter",
+    ]
+    assert df["lang"].tolist() == ["en", "en", "en", "fr", "en"]
+
+
+def test_chunks_give_the_same_rows(tmp_path, stub_nlp, monkeypatch):
+    # tickets of very different lengths, so the balanced chunks differ from the chunks of fixed size
+    path = tmp_path / "tickets.csv"
+    pd.DataFrame(
+        {
+            "id": range(30),
+            "title": [f"Ticket {index} crashes" for index in range(30)],
+            "content": [" ".join(["tabs"] * (index % 7) ** 3) + f" number {index}" for index in range(30)],
+        }
+    ).to_csv(path, index=False)
+
+    def preprocess(**kwargs):
+        with Preprocess(str(path), instrumentation=Instrumentation([]), **kwargs) as preprocessor:
+            preprocessor.preprocess_tickets()
+            return preprocessor._df
+
+    # a single chunk on a single worker
+    with monkeypatch.context() as patch:
+        patch.setattr(preprocessing, "CHUNKS_PER_WORKER", 1)
+        single = preprocess(n_cores=1)
+    assert single["id"].tolist() == list(range(30))
+    for kwargs in [{"n_cores": 3}, {"n_cores": 2, "chunksize": 4}, {"n_cores": 2, "work_dir": str(tmp_path / "job")}]:
+        pd.testing.assert_frame_equal(preprocess(**kwargs), single)
+
+
+def test_cache_stats_in_stage_metrics(tmp_path, input_file, stub_nlp, capsys):
+    cache_file = str(tmp_path / "cache.sqlite")
+    for _ in range(2):
+        instrumentation = Instrumentation([])
+        with Preprocess(input_file, n_cores=2, cache_file=cache_file, instrumentation=instrumentation) as preprocessor:
+            preprocessor.preprocess_tickets()
+
+    # the second run only looks the tickets up
+    assert [stage["stage"] for stage in instrumentation.stages] == ["Cache lookup"]
+    assert instrumentation.stages[0]["extra"]["hits"] == 5
+    assert "Cache" not in capsys.readouterr().out
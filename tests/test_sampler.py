@@ -0,0 +1,49 @@
+import random
+
+from canosp2020.sampler import StratifiedSampler
+
+
+def test_proportional_allocation():
+    sampler = StratifiedSampler(10, random.Random(0))
+    for item in range(900):
+        sampler.add(0, item)
+    for item in range(900, 1000):
+        sampler.add(1, item)
+
+    assert sampler.allocation(10) == {0: 9, 1: 1}
+    sample = sampler.sample(10)
+    assert len(sample) == len(set(sample)) == 10
+    assert sum(item >= 900 for item in sample) == 1
+
+
+def test_largest_remainder():
+    sampler = StratifiedSampler(10, random.Random(0))
+    for stratum, size in [("a", 5), ("b", 3), ("c", 2)]:
+        for item in range(size):
+            sampler.add(stratum, (stratum, item))
+
+    assert sampler.allocation(3) == {"a": 1, "b": 1, "c": 1}
+    assert sampler.allocation(4) == {"a": 2, "b": 1, "c": 1}
+    assert sum(sampler.allocation(7).values()) == 7
+
+
+def test_too_few_items():
+    sampler = StratifiedSampler(10, random.Random(0))
+    assert sampler.sample(5) == []
+
+    for item in range(3):
+        sampler.add(item % 2, item)
+    assert sorted(sampler.sample(5)) == [0, 1, 2]
+
+
+def test_uniform():
+    counts = [0] * 20
+    for seed in range(2000):
+        sampler = StratifiedSampler(5, random.Random(seed))
+        for item in range(20):
+            sampler.add(0, item)
+        for item in sampler.sample(5):
+            counts[item] += 1
+
+    # every item is drawn with probability 5 / 20
+    assert all(400 < count < 600 for count in counts)
@@ -0,0 +1,63 @@
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from canosp2020.scheduler import balanced_bounds, map_chunks, split_balanced  # noqa: E402
+
+
+class ReversedPool:
+    """Hands the results back in the reverse order of the tasks, like a worker pool finishing the last task first."""
+
+    def imap_unordered(self, func, tasks, chunksize=1):
+        return reversed([func(task) for task in tasks])
+
+
+@pytest.mark.parametrize(
+    "lengths,n_chunks",
+    [
+        ([], 4),
+        ([5], 4),
+        ([1, 1, 1, 1, 1, 1, 1, 1], 3),
+        ([1000, 1, 1, 1, 1, 1], 4),
+        ([1, 1, 1, 1, 1000], 4),
+        ([3, 0, 7, 120, 2, 2, 50, 9, 1, 1, 0, 30], 5),
+        (list(range(100)), 16),
+    ],
+)
+def test_balanced_bounds_cover_every_row(lengths, n_chunks):
+    bounds = balanced_bounds(lengths, n_chunks)
+
+    assert len(bounds) <= max(n_chunks, 1)
+    rows = [row for start, end in bounds for row in range(start, end)]
+    assert rows == list(range(len(lengths)))
+
+
+def test_balanced_bounds_are_balanced():
+    bounds = balanced_bounds([10] * 100, 4)
+    assert bounds == [(0, 25), (25, 50), (50, 75), (75, 100)]
+
+
+def test_split_balanced():
+    df = pd.DataFrame({"title": ["a", "bb", None, "d"], "content": ["x" * 50, "", "y", "z"]})
+
+    chunks = split_balanced(df, 2)
+    assert [len(chunk) for chunk in chunks] == [1, 3]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+
+def test_map_chunks_keeps_chunk_order():
+    chunks = [[1], [2, 2, 2], [3, 3], [4, 4, 4, 4]]
+
+    assert map_chunks(sum, chunks, ReversedPool(), weights=[len(chunk) for chunk in chunks]) == [1, 6, 6, 16]
+    with multiprocessing.Pool(2) as pool:
+        assert map_chunks(sum, chunks, pool) == [1, 6, 6, 16]
+
+
+def test_map_chunks_callback():
+    done = {}
+
+    assert map_chunks(sum, [[1], [2, 2]], ReversedPool(), callback=done.__setitem__) == [None, None]
+    assert done == {0: 1, 1: 4}
@@ -0,0 +1,63 @@
+import json
+
+from canosp2020.store import TicketStore, read_tickets
+
+TAGGERS = [
+    {"tagger_id": "0", "is_expert": False, "is_sumo": True},
+    {"tagger_id": "3", "is_expert": True, "is_sumo": False},
+]
+
+
+def make_ticket(ticket_id, timestamp, tags):
+    return {
+        "ticket_id": str(ticket_id),
+        "title": f"title {ticket_id}",
+        "content": "é",
+        "timestamp": timestamp,
+        "tags": tags,
+    }
+
+
+def test_upsert_and_query(tmp_path):
+    path = str(tmp_path / "tickets.db")
+    with TicketStore(path) as store:
+        store.upsert_taggers(TAGGERS)
+        store.upsert_tickets(
+            [
+                make_ticket(2, 200, {"0": ["crash"], "3": ["crash", "slow"]}),
+                make_ticket(1, 100, {"0": []}),
+                make_ticket(3, 300, {"0": ["sync"], "3": []}),
+            ],
+            batch_size=2,
+        )
+        # sumo tags are refreshed, the crowdsourced tags are kept
+        store.upsert_tickets([make_ticket(2, 200, {"0": ["hang"]})])
+
+        assert len(store) == 3
+        assert store.taggers() == TAGGERS
+        assert [ticket["ticket_id"] for ticket in store.iter_tickets()] == ["1", "2", "3"]
+        assert next(store.iter_tickets(tag="crash")) == make_ticket(2, 200, {"0": ["hang"], "3": ["crash", "slow"]})
+        assert [ticket["ticket_id"] for ticket in store.iter_tickets(tagger_id="3")] == ["2", "3"]
+        assert [ticket["ticket_id"] for ticket in store.iter_tickets(since=200, until=300)] == ["2"]
+        assert list(store.iter_tickets(tag="hang", tagger_id="3", since=300)) == []
+
+
+def test_read_tickets(tmp_path):
+    tickets = [make_ticket(1, 100, {"0": ["crash"]}), make_ticket(2, 200, {"0": [], "3": ["slow"]})]
+
+    json_path = tmp_path / "tickets.json"
+    json_path.write_text(json.dumps({"taggers": TAGGERS, "tickets": tickets}))
+    db_path = tmp_path / "tickets.db"
+    with TicketStore(str(db_path)) as store:
+        # taggers come out ordered by id
+        store.upsert_taggers(TAGGERS[::-1] + [{"tagger_id": "10", "is_expert": True, "is_sumo": False}])
+        store.upsert_taggers(TAGGERS)
+        store.upsert_tickets(tickets)
+
+    taggers, result = read_tickets(json_path)
+    assert taggers == TAGGERS
+    assert list(result) == tickets
+
+    taggers, result = read_tickets(db_path)
+    assert taggers == TAGGERS + [{"tagger_id": "10", "is_expert": True, "is_sumo": False}]
+    assert list(result) == tickets
@@ -0,0 +1,41 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from canosp2020.tokens import TokenWriter, load_tokens, read_tokens  # noqa: E402
+
+
+def chunk(ids, titles, contents, langs):
+    df = pd.DataFrame({"id": ids, "title": titles, "content": contents, "lang": langs})
+    df["title_content"] = df["title"] + " " + df["content"]
+    return df
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "tokens.parquet")
+    chunks = [
+        chunk([1, 2], ["firefox crash", "slow tab"], ["crash start", ""], ["en", "en"]),
+        chunk([3], ["onglet"], ["onglet disparu"], ["fr"]),
+    ]
+    # a missing text has no tokens
+    chunks[1].loc[:, "title"] = None
+
+    with TokenWriter(path) as writer:
+        for df in chunks:
+            writer.write(df)
+
+    tokens = read_tokens(path)
+    assert tokens.columns.tolist() == ["id", "lang", "title_tokens", "content_tokens", "title_content_tokens"]
+    assert tokens["id"].tolist() == [1, 2, 3]
+    assert tokens["lang"].tolist() == ["en", "en", "fr"]
+    assert [list(row) for row in tokens["title_tokens"]] == [["firefox", "crash"], ["slow", "tab"], []]
+    assert [list(row) for row in tokens["content_tokens"]] == [["crash", "start"], [], ["onglet", "disparu"]]
+
+    assert read_tokens(path, columns=["id"]).columns.tolist() == ["id"]
+    assert load_tokens(path) == [
+        ["firefox", "crash", "crash", "start"],
+        ["slow", "tab"],
+        ["onglet", "onglet", "disparu"],
+    ]
+    assert load_tokens(path, "content", lang="fr") == [["onglet", "disparu"]]
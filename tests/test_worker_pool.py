@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+pytest.importorskip("langdetect")
+pytest.importorskip("spacy")
+
+from canosp2020 import worker_pool  # noqa: E402
+
+
+def worker_model(_):
+    return os.getpid(), id(worker_pool.worker_nlp()), len(worker_pool._models)
+
+
+def test_load_nlp_once_per_process(stub_nlp):
+    nlp = worker_pool.load_nlp()
+    assert worker_pool.load_nlp() is nlp
+    custom = worker_pool.load_nlp(stopwords=["tabs", "Sync"])
+    assert worker_pool.load_nlp(stopwords=["Sync", "tabs", "tabs"]) is custom
+
+    assert stub_nlp == [nlp, custom]
+    assert custom.pipe_names == ["language_detector"]
+    assert custom.vocab["tabs"].is_stop and custom.vocab["sync"].is_stop and custom.vocab["Sync"].is_stop
+    # the custom stop words do not leak into the other models
+    assert not nlp.vocab["tabs"].is_stop
+    assert not worker_pool.load_nlp("other_model").vocab["sync"].is_stop
+
+
+def test_workers_reuse_their_model(stub_nlp):
+    with worker_pool.WorkerPool(2) as pool:
+        results = pool.map(worker_model, range(50))
+
+    models = {}
+    for pid, model, loaded in results:
+        models.setdefault(pid, set()).add(model)
+        assert loaded == 1
+    assert all(len(ids) == 1 for ids in models.values())
+
+
+def test_stream_spacy_keeps_order(stub_nlp):
+    for module in ("gensim", "nltk", "num2words", "requests_html"):
+        pytest.importorskip(module)
+    from canosp2020.preprocessing import stream_spacy
+
+    texts = [f"ticket {index} the crashes" for index in range(100)] + ["où sont mes onglets"]
+    with worker_pool.WorkerPool(3) as pool:
+        content = list(stream_spacy(texts, "content", pool, batch_size=7))
+        title = list(stream_spacy(texts, "title", pool, batch_size=7))
+
+    assert content[:100] == [(f"ticket {index} crashe", "en") for index in range(100)]
+    assert content[100] == ("où sont mes onglets", "fr")
+    assert title == [(f"ticket {index} crashe", None) for index in range(100)] + [("où sont me onglet", None)]
@@ -1,7 +1,22 @@
-import json
 import csv
 import argparse
+import gzip
 import pathlib
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from canosp2020.export import TicketWriter, export_tickets
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed to write .zst files
+    zstandard = None
+
+# commas, double quotes and newlines are removed from the CSV text
+REMOVED_CHARS = str.maketrans("", "", ',"\n\r')
+
+# Number of tickets in a Parquet row group
+PARQUET_BATCH_SIZE = 10000
 
 
 def preprocess_text(text):
@@ -10,11 +25,23 @@ def preprocess_text(text):
 
     text -- string to be preprocessed
     """
-    text = text.replace(",", "")  # remove commas
-    text = text.replace('"', "")  # remove double quotes
-    text = text.replace("\n", "")  # remove newlines
-    text = text.replace("\r", "")  # remove other newlines
-    return text
+    return text.translate(REMOVED_CHARS)
+
+
+def open_output(path):
+    """
+    Opens a text file for writing, compressed according to its suffix (.gz or .zst)
+
+    path -- path to the output file
+    """
+    suffix = pathlib.Path(path).suffix
+    if suffix == ".gz":
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    if suffix == ".zst":
+        if zstandard is None:
+            raise ImportError("writing .zst files needs the zstandard package")
+        return zstandard.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", newline="")
 
 
 def write_ticket(csv_writer, ticket, taggers):
@@ -48,56 +75,115 @@ def write_ticket(csv_writer, ticket, taggers):
     # print(ticket_list)
 
 
-def ticket_to_csv(json_path, csv_path):
+class TicketCSVWriter(TicketWriter):
     """
-    Converts a ticket JSON file into a CSV file
+    Writes tickets as rows of a CSV file, with a column of tags per tagger
 
-    json_path -- path to the input JSON file
-    csv_path -- path to the output CSV file
+    csv_path -- path to the output CSV file, compressed if it ends with .gz or .zst
     """
-    num_tickets = 0
-    num_unique_tickets = 0
-    ticket_ids = set()
-
-    # load JSON file
-    with open(json_path, "r") as json_file:
-        json_dict = json.loads(json_file.read())
-
-    taggers = []
-    for tagger in json_dict["taggers"]:
-        taggers.append(tagger["tagger_id"])
-    # print("Taggers:", taggers)
-
-    # create CSV writer
-    csv_file = open(csv_path, "w", newline="")
-    csv_writer = csv.writer(csv_file, delimiter=",")
-
-    # write the CSV header
-    csv_columns = ["id", "title", "content"] + taggers
-    csv_writer.writerow(csv_columns)
-
-    for ticket in json_dict["tickets"]:
-        # check for duplicates, update statistics
-        num_tickets += 1
-        if ticket["ticket_id"] in ticket_ids:
-            continue
-        ticket_ids.add(ticket["ticket_id"])
-        num_unique_tickets += 1
 
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.num_tickets = 0
+
+    def open(self, taggers):
+        self.taggers = [tagger["tagger_id"] for tagger in taggers]
+
+        # create CSV writer
+        self.csv_file = open_output(self.csv_path)
+        self.csv_writer = csv.writer(self.csv_file, delimiter=",")
+
+        # write the CSV header
+        csv_columns = ["id", "title", "content"] + self.taggers
+        self.csv_writer.writerow(csv_columns)
+
+    def write(self, ticket):
         # write the ticket as a row in the CSV
-        write_ticket(csv_writer, ticket, taggers)
+        write_ticket(self.csv_writer, ticket, self.taggers)
+        self.num_tickets += 1
 
-    csv_file.close()
+    def close(self):
+        self.csv_file.close()
+        return f"Wrote {self.num_tickets} tickets to {self.csv_path}"
 
-    print(f"Wrote {num_unique_tickets} tickets to {csv_path} ({num_tickets - num_unique_tickets} duplicates)")
+
+class TicketParquetWriter(TicketWriter):
+    """
+    Writes tickets to a Parquet file, with a list column of tags per tagger
+
+    The text is kept verbatim. The tags of a tagger who did not tag a ticket are null.
+
+    parquet_path -- path to the output Parquet file
+    batch_size -- # of tickets per row group
+    """
+
+    def __init__(self, parquet_path, batch_size=PARQUET_BATCH_SIZE):
+        self.parquet_path = parquet_path
+        self.batch_size = batch_size
+        self.num_tickets = 0
+
+    def open(self, taggers):
+        self.taggers = [tagger["tagger_id"] for tagger in taggers]
+        fields = [("id", pa.string()), ("title", pa.string()), ("content", pa.string())]
+        fields += [(tagger, pa.list_(pa.string())) for tagger in self.taggers]
+        self.schema = pa.schema(fields)
+        self.parquet_writer = pq.ParquetWriter(str(self.parquet_path), self.schema, compression="zstd")
+        self.columns = {name: [] for name in self.schema.names}
+
+    def write(self, ticket):
+        self.columns["id"].append(str(ticket["ticket_id"]))
+        self.columns["title"].append(ticket["title"])
+        self.columns["content"].append(ticket["content"])
+        for tagger in self.taggers:
+            self.columns[tagger].append(ticket["tags"].get(tagger))
+        self.num_tickets += 1
+
+        if len(self.columns["id"]) == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.columns["id"]:
+            self.parquet_writer.write_table(pa.table(self.columns, schema=self.schema))
+            self.columns = {name: [] for name in self.schema.names}
+
+    def close(self):
+        self.flush()
+        self.parquet_writer.close()
+        return f"Wrote {self.num_tickets} tickets to {self.parquet_path}"
+
+
+def ticket_writer(path):
+    """
+    Writer for the output format given by the suffix of the path: .parquet, .csv, .csv.gz or .csv.zst
+
+    path -- path to the output file
+    """
+    if pathlib.Path(path).suffix == ".parquet":
+        return TicketParquetWriter(path)
+    return TicketCSVWriter(path)
+
+
+def ticket_to_csv(json_path, csv_path):
+    """
+    Converts a ticket JSON file into a CSV file, see export_tickets.py to write several formats at once
+
+    json_path -- path to the input JSON file or .db ticket store
+    csv_path -- path to the output file, see `ticket_writer` for the formats
+    """
+    export_tickets(json_path, [ticket_writer(csv_path)])
 
 
 # this runs when you directly run the file (not when imported)
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert a ticket JSON file to CSV format")
-    parser.add_argument("--json_file", help="the relative path to the input JSON file", required=True)
     parser.add_argument(
-        "--csv_file", help="the relative path to the output CSV file (will be overwritten if exists)", required=True
+        "--json_file", help="the relative path to the input JSON file or .db ticket store", required=True
+    )
+    parser.add_argument(
+        "--csv_file",
+        help="the relative path to the output CSV file (will be overwritten if exists), "
+        "compressed if it ends with .gz or .zst, or a Parquet file if it ends with .parquet",
+        required=True,
     )
 
     args = parser.parse_args()
@@ -2,7 +2,7 @@
 Usage: word2vec.py [OPTIONS]
 
 Options:
-  --input_file TEXT       Path to input CSV file.
+  --input_file TEXT       Path to input CSV or token parquet file.
   --output_file TEXT      Path to save output genism model.
   --output_bin_file TEXT  Path to save output word2vec format model.
   --min_count INTEGER     Ignores all words with total frequency lower than
@@ -26,6 +26,7 @@ import numpy as np
 
 from gensim.test.utils import common_texts, get_tmpfile
 from gensim.models import Word2Vec
+from canosp2020.tokens import load_tokens
 
 nlp = spacy.load("en_core_web_sm")
 
@@ -33,7 +34,7 @@ TITLE_CONTENT = "title_content"
 
 
 @click.command()
-@click.option("--input_file", default="data/tickets_preprocessed.csv", help="Path to input CSV file.")
+@click.option("--input_file", default="data/tickets_preprocessed.csv", help="Path to input CSV or token parquet file.")
 @click.option("--output_file", default="data/tickets_word2vec.model", help="Path to save output genism model.")
 @click.option(
     "--output_bin_file", default="data/tickets_word2vec.bin", help="Path to save output word2vec format model."
@@ -51,15 +52,19 @@ def main(input_file, output_file, output_bin_file, min_count, size, window, work
         print("Input file does not exist.", file=sys.stderr)
         sys.exit(1)
 
-    # Load csv file and merge title and content column
-    df = pd.read_csv(input_file)
-    df[TITLE_CONTENT] = df["title"] + " " + df["content"]
-    df[TITLE_CONTENT].replace("", np.nan, inplace=True)
-    df.dropna(subset=[TITLE_CONTENT], inplace=True)
-    docs = list(
-        nlp.pipe(df["title_content"], disable=["tagger", "parser", "ner"], n_process=multiprocessing.cpu_count())
-    )
-    sents = [[token.text for token in doc] for doc in docs]
+    if input_file.endswith(".parquet"):
+        # Tokens written by Preprocess.preprocess_to_parquet, no need to tokenize again
+        sents = [tokens for tokens in load_tokens(input_file) if tokens]
+    else:
+        # Load csv file and merge title and content column
+        df = pd.read_csv(input_file)
+        df[TITLE_CONTENT] = df["title"] + " " + df["content"]
+        df[TITLE_CONTENT].replace("", np.nan, inplace=True)
+        df.dropna(subset=[TITLE_CONTENT], inplace=True)
+        docs = list(
+            nlp.pipe(df["title_content"], disable=["tagger", "parser", "ner"], n_process=multiprocessing.cpu_count())
+        )
+        sents = [[token.text for token in doc] for doc in docs]
 
     # Train word2vec model
     model = Word2Vec(sents, min_count=min_count, size=size, workers=workers, window=window)